@@ -7,8 +7,10 @@ DEFAULTS = {
         {
             'start_size': '15',
             'size_limit': '1',
+            'overview_below': '1',
             'color': 'white',
-            'draw_func': ''
+            'draw_func': '',
+            'render': 'items'
         },
     'rules':
         {
@@ -21,16 +23,51 @@ DEFAULTS = {
         },
     'grid':
         {
-            'color': 'grey'
+            'color': 'grey',
+            'engine': 'python',
+            'topology': 'torus',
+            'workers': '0',
+            'width': '0',
+            'height': '0',
+            'line_size_limit': '4'
         },
     'selection':
         {
             'color': 'yellow',
             'color_over_cell': 'red'
         },
+    'simulation':
+        {
+            'threaded': 'no',
+            'render_interval': '30',
+            'queue_size': '2'
+        },
+    'history':
+        {
+            'memory_limit': '16777216',
+            'keyframe_interval': '64'
+        },
+    'cycles':
+        {
+            'table_size': '4096',
+            'pause': 'no'
+        },
+    'stats':
+        {
+            'overlay': 'no',
+            'window': '200'
+        },
+    'age':
+        {
+            'color_by': 'none',
+            'ages': '0,2,8,32,128',
+            'colors': '#fff,#ff8,#fc4,#f80,#f40',
+            'trail_colors': '#444,#333,#222,#111'
+        },
     'pattern_directories':
         {
-            'startup': ''
+            'startup': '',
+            'cache': 'pattern_cache.bin'
         }
 }
 
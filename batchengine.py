@@ -0,0 +1,89 @@
+import numpy as np
+
+import life
+import numpyengine
+
+
+class BatchedUniverses(object):
+    """
+    Many toroidal universes of the same size stepped together.
+
+    cells is a bool array indexed [universe][x][y] and tables holds a
+    [alive][neighbour count] rule table for every universe, so each one can
+    follow its own rules.
+    """
+
+    def __init__(self, count, width, height, rules=None):
+        self.cells = np.zeros((count, width, height), dtype=bool)
+        self.tables = np.zeros((count, 2, 9), dtype=bool)
+        self.generation = 0
+        if rules is not None:
+            self.set_rules(rules)
+
+    @classmethod
+    def from_cells(cls, cells, rules=None):
+        """ Universes from a bool array indexed [universe][x][y] """
+        cells = np.asarray(cells, dtype=bool)
+        universes = cls(*cells.shape, rules=rules)
+        universes.cells[:] = cells
+        return universes
+
+    @classmethod
+    def random(cls, count, width, height, density, rules=None, seed=None):
+        """ Universes filled with independent random soups """
+        generator = np.random.default_rng(seed)
+        return cls.from_cells(
+            generator.random((count, width, height)) < density, rules)
+
+    @property
+    def count(self):
+        return self.cells.shape[0]
+
+    @property
+    def width(self):
+        return self.cells.shape[1]
+
+    @property
+    def height(self):
+        return self.cells.shape[2]
+
+    def set_rules(self, rules, universe=None):
+        """
+        Set the Rules of one universe, or of all of them if universe is
+        None. rules may also be a sequence with Rules for every universe.
+        """
+        if universe is not None:
+            self.tables[universe] = numpyengine.rule_table(rules)
+        elif isinstance(rules, life.Rules):
+            self.tables[:] = numpyengine.rule_table(rules)
+        else:
+            if len(rules) != self.count:
+                raise ValueError('Expected Rules for {} universes, got {}'
+                                 .format(self.count, len(rules)))
+            for index, universe_rules in enumerate(rules):
+                self.tables[index] = numpyengine.rule_table(universe_rules)
+
+    def next_generation(self, generations=1):
+        """ Advance every universe by generations """
+        # look cells up in the flattened tables, each universe's table is
+        # 18 entries long and indexed by alive * 9 + neighbour count
+        tables = self.tables.reshape(-1)
+        offsets = (np.arange(self.count, dtype=np.intp) *
+                   18)[:, np.newaxis, np.newaxis]
+        for _ in range(generations):
+            if self.cells.size == 0:
+                break
+            index = (self.cells.view(np.uint8) * 9 +
+                     numpyengine.neighbour_counts(self.cells))
+            self.cells = tables.take(offsets + index)
+        self.generation += generations
+
+    @property
+    def population(self):
+        """ Live cells of every universe """
+        return np.count_nonzero(self.cells, axis=(1, 2))
+
+    @property
+    def extinct(self):
+        """ Whether each universe has no live cells """
+        return ~self.cells.any(axis=(1, 2))
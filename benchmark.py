@@ -0,0 +1,380 @@
+"""
+Reproducible benchmarks for the stepping engines, batched universes, the RLE
+parser and the canvas rendering.
+
+    python benchmark.py --output results.json
+    python benchmark.py --output new.json --compare results.json
+
+Every case is timed over --repeats runs and the median is reported. With
+--compare, cases slower than the baseline by more than --threshold are
+listed as regressions and the exit status is 1.
+"""
+import argparse
+from configparser import RawConfigParser
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import life
+import lifecli
+import rleexport
+
+RULES = life.Rules((3,), (2, 3))
+
+R_PENTOMINO = """x = 3, y = 3, rule = B3/S23
+b2o$2o$bo!
+"""
+
+GOSPER_GUN = """x = 36, y = 9, rule = B3/S23
+24bo$22bobo$12b2o6b2o12b2o$11bo3bo4b2o12b2o$2o8bo5bo3b2o$2o8bo3bob2o4b\
+obo$10bo5bo7bo$11bo3bo$12b2o!
+"""
+
+PATTERNS = {
+    'r-pentomino': R_PENTOMINO,
+    'gosper-gun': GOSPER_GUN,
+}
+
+DENSITIES = (0.1, 0.3, 0.5)
+
+# engines timed through CellGrid.next_generation, list based grids get slow
+# and memory hungry quickly
+CELLGRID_ENGINES = ('python', 'tiled', 'sparse', 'numpy')
+
+
+def timed(func, repeats):
+    """ Median and minimum wall time of calling func repeats times """
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), min(times)
+
+
+def soup(width, height, density, seed):
+    """ Random bool array indexed [x][y] """
+    return np.random.default_rng(seed).random((width, height)) < density
+
+
+def pattern_cells(name, width, height):
+    """ Array indexed [x][y] with a named pattern in the middle """
+    with tempfile.NamedTemporaryFile('w', suffix='.rle',
+                                     delete=False) as f:
+        f.write(PATTERNS[name])
+    try:
+        _, pattern = life.Pattern.parsefile(f.name)
+    finally:
+        os.remove(f.name)
+
+    grid = lifecli.fixed_grid(width, height)
+    lifecli.place_pattern(grid, pattern)
+    return np.array(grid, dtype=bool).reshape(width, height)
+
+
+def initial_cells(name, size, seed):
+    if name.startswith('soup-'):
+        return soup(size, size, float(name[len('soup-'):]), seed)
+    return pattern_cells(name, size, size)
+
+
+def stepper(engine, cells, workers):
+    """ A function running one generation of cells with engine """
+    width, height = cells.shape
+
+    if engine in CELLGRID_ENGINES:
+        grid = lifecli.fixed_grid(width, height, engine)
+        for x, y in zip(*np.nonzero(cells)):
+            grid.set_cell(int(x), int(y), True)
+        return lambda: grid.next_generation(RULES), None
+
+    if engine == 'numpy-array':
+        import numpyengine
+        state = [cells]
+        table = numpyengine.rule_table(RULES)
+
+        def step():
+            state[0] = numpyengine.step(state[0], RULES, table)
+        return step, None
+
+    if engine == 'packed':
+        import packedengine
+        packed = packedengine.PackedGrid.from_cells(cells)
+        return lambda: packed.next_generation(RULES), None
+
+    if engine == 'parallel':
+        import parallelengine
+        parallel = parallelengine.ParallelStepper(width, height, workers)
+        parallel.cells[:] = cells
+        return lambda: parallel.next_generation(RULES), parallel.close
+
+    raise ValueError('Unknown benchmark engine: {}'.format(engine))
+
+
+def bench_engines(args, results):
+    for size in args.sizes:
+        for name in args.patterns:
+            cells = initial_cells(name, size, args.seed)
+            for engine in args.engines:
+                if (engine in CELLGRID_ENGINES and
+                        size * size > args.max_cellgrid_cells):
+                    continue
+
+                step, close = stepper(engine, cells, args.workers)
+
+                def run():
+                    for _ in range(args.generations):
+                        step()
+                try:
+                    median, best = timed(run, args.repeats)
+                finally:
+                    if close is not None:
+                        close()
+
+                results.append({
+                    'name': 'step/{}/{}/{}'.format(engine, name, size),
+                    'seconds': median,
+                    'best': best,
+                    'generations': args.generations,
+                    'cells_per_second':
+                        size * size * args.generations / median,
+                })
+                print_result(results[-1])
+
+
+def bench_hashlife(args, results):
+    import hashlife
+
+    for name in PATTERNS:
+        cells = pattern_cells(name, 64, 64)
+
+        def run():
+            universe = hashlife.HashLife(RULES)
+            universe.set_cells((int(x), int(y))
+                               for x, y in zip(*np.nonzero(cells)))
+            universe.step(args.hashlife_power)
+
+        median, best = timed(run, args.repeats)
+        results.append({
+            'name': 'hashlife/{}/2^{}'.format(name, args.hashlife_power),
+            'seconds': median,
+            'best': best,
+        })
+        print_result(results[-1])
+
+
+def bench_batch(args, results):
+    import batchengine
+
+    size = args.batch_size
+    for count in args.batch_counts:
+        universes = batchengine.BatchedUniverses.random(
+            count, size, size, 0.3, RULES, args.seed)
+        median, best = timed(
+            lambda: universes.next_generation(args.generations), args.repeats)
+        results.append({
+            'name': 'batch/{}x{}'.format(count, size),
+            'seconds': median,
+            'best': best,
+            'generations': args.generations,
+            'cells_per_second':
+                count * size * size * args.generations / median,
+        })
+        print_result(results[-1])
+
+
+def bench_parse(args, results):
+    directory = tempfile.mkdtemp()
+    try:
+        for size in args.parse_sizes:
+            filename = os.path.join(directory, 'soup{}.rle'.format(size))
+            rleexport.write_rle(soup(size, size, 0.3, args.seed), filename,
+                                RULES)
+            median, best = timed(lambda: life.Pattern.parsefile(filename),
+                                 args.repeats)
+            results.append({
+                'name': 'parse/soup/{}'.format(size),
+                'seconds': median,
+                'best': best,
+                'bytes': os.path.getsize(filename),
+            })
+            print_result(results[-1])
+    finally:
+        shutil.rmtree(directory)
+
+
+def virtual_display():
+    """ Start Xvfb if there is no display, returning its process or None """
+    if os.environ.get('DISPLAY') or shutil.which('Xvfb') is None:
+        return None
+    display = ':{}'.format(90 + os.getpid() % 10)
+    process = subprocess.Popen(['Xvfb', display, '-screen', '0',
+                                '1920x1080x24'],
+                               stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    time.sleep(1)
+    os.environ['DISPLAY'] = display
+    return process
+
+
+def bench_render(args, results):
+    display = virtual_display()
+    try:
+        import tkinter as tk
+        from tklife import CellCanvas
+        # the settings defaults live in the package's __init__.py
+        from __init__ import DEFAULTS
+
+        try:
+            root = tk.Tk()
+        except tk.TclError as e:
+            print('skipping render benchmarks: {}'.format(e),
+                  file=sys.stderr)
+            return
+
+        for render in ('items', 'raster'):
+            settings = RawConfigParser()
+            settings.read_dict(DEFAULTS)
+            settings.read_dict({'cell': {'start_size': '4', 'render': render},
+                                'grid': {'engine': 'numpy'}})
+            for size in args.render_sizes:
+                cells = soup(size, size, 0.3, args.seed)
+                canvas = CellCanvas(settings, lambda _: size,
+                                    lambda _: size, master=root)
+                canvas.pack()
+                empty = canvas.copy_grid()
+                canvas.setgrid(cells.tolist())
+                canvas.engine.reset()
+
+                def draw():
+                    canvas.draw_all_cells(empty)
+                    root.update()
+                    canvas.undraw_all_cells()
+
+                def new_gen():
+                    canvas.new_gen(RULES)
+                    root.update()
+
+                for name, func in (('draw_all_cells', draw),
+                                   ('new_gen', new_gen)):
+                    median, best = timed(func, args.repeats)
+                    results.append({
+                        'name': 'render/{}/{}/{}'.format(render, name, size),
+                        'seconds': median,
+                        'best': best,
+                    })
+                    print_result(results[-1])
+                canvas.destroy()
+        root.destroy()
+    finally:
+        if display is not None:
+            display.terminate()
+
+
+def print_result(result):
+    print('{:<48} {:10.4f} s'.format(result['name'], result['seconds']),
+          file=sys.stderr)
+
+
+def compare(results, baseline, threshold):
+    """ Cases at least threshold slower than baseline, as (name, ratio) """
+    previous = {result['name']: result['seconds']
+                for result in baseline['results']}
+    regressions = []
+    for result in results:
+        if result['name'] in previous and previous[result['name']] > 0:
+            ratio = result['seconds'] / previous[result['name']]
+            if ratio > 1 + threshold:
+                regressions.append((result['name'], ratio))
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--engines', nargs='+',
+                        default=['python', 'tiled', 'sparse', 'numpy',
+                                 'numpy-array', 'packed', 'parallel'])
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        default=[100, 1000, 10000])
+    parser.add_argument('--patterns', nargs='+',
+                        default=['soup-{}'.format(density)
+                                 for density in DENSITIES] +
+                        sorted(PATTERNS))
+    parser.add_argument('--generations', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--max-cellgrid-cells', type=int, default=10 ** 6,
+                        help='largest grid stepped through a list CellGrid')
+    parser.add_argument('--hashlife-power', type=int, default=10)
+    parser.add_argument('--batch-counts', nargs='+', type=int,
+                        default=[100, 1000],
+                        help='universes stepped together by batchengine')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--parse-sizes', nargs='+', type=int,
+                        default=[100, 1000])
+    parser.add_argument('--render-sizes', nargs='+', type=int,
+                        default=[100, 250])
+    parser.add_argument('--skip', nargs='+', default=[],
+                        choices=['engines', 'hashlife', 'batch', 'parse',
+                                 'render'])
+    parser.add_argument('--output', help='JSON file for the results')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='JSON results to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    results = []
+    benchmarks = (('engines', bench_engines), ('hashlife', bench_hashlife),
+                  ('batch', bench_batch), ('parse', bench_parse),
+                  ('render', bench_render))
+    for name, bench in benchmarks:
+        if name not in args.skip:
+            bench(args, results)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': args.seed,
+            'generations': args.generations,
+            'repeats': args.repeats,
+        },
+        'results': results,
+    }
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, ratio in regressions:
+            print('REGRESSION {:<48} {:.2f}x slower'.format(name, ratio),
+                  file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Ages of cells, and their colours by age.
+
+An AgeLayer follows a grid through the changed cells of each generation and
+keeps a uint16 count for every cell: in 'age' mode the generations a cell
+has been alive, in 'change' mode the generations since it last changed. A
+Palette sorts the counts into buckets of one colour each, and only cells
+whose bucket changed are handed back for repainting.
+"""
+import numpy as np
+
+MODES = ('age', 'change')
+MAX_AGE = int(np.iinfo(np.uint16).max)
+
+
+class Palette(object):
+    """
+    Live cells get colors[i] from ages[i] on. Dead cells get trail_colors[i]
+    i generations after they died, in 'change' mode only.
+    """
+
+    def __init__(self, ages, colors, trail_colors=()):
+        ages = list(ages)
+        if (len(ages) != len(colors) or not ages or ages[0] != 0 or
+                any(a >= b for a, b in zip(ages, ages[1:]))):
+            raise ValueError('Expected rising ages from 0 with a colour each, '
+                             'got {} and {}'.format(ages, list(colors)))
+        if len(colors) + len(trail_colors) >= 255:
+            raise ValueError('Too many colours')
+
+        self.ages = np.array(ages, dtype=np.uint16)
+        self.colors = list(colors)
+        self.trail_colors = list(trail_colors)
+
+    @classmethod
+    def from_settings(cls, section):
+        """ A Palette from the [age] section of the settings """
+        def parse_list(value):
+            return [item.strip() for item in value.split(',') if item.strip()]
+
+        return cls([int(age) for age in parse_list(section['ages'])],
+                   parse_list(section['colors']),
+                   parse_list(section['trail_colors']))
+
+
+class AgeLayer(object):
+    """
+    Age of every cell of a grid, with the palette bucket each cell was last
+    painted in. colors[bucket] is the colour of a bucket, None for the
+    background.
+    """
+
+    def __init__(self, palette, mode='age'):
+        if mode not in MODES:
+            raise ValueError('Unknown age mode: {}'.format(mode))
+        self.palette = palette
+        self.mode = mode
+        self.colors = [None] + palette.colors
+        if mode == 'change':
+            self.colors += palette.trail_colors
+
+        self.alive = None
+        self.ages = None
+        self.buckets = None
+
+    @property
+    def newborn_color(self):
+        return self.palette.colors[0]
+
+    def reset(self, grid):
+        """
+        Start over from grid, a list of columns, with every live cell aged 0.
+        Returns the cells to repaint like step().
+        """
+        alive = np.array(grid, dtype=bool).reshape(
+            len(grid), len(grid[0]) if len(grid) else 0)
+        if self.buckets is None or self.buckets.shape != alive.shape:
+            self.buckets = np.zeros(alive.shape, dtype=np.uint8)
+        self.alive = alive
+        self.ages = np.zeros(alive.shape, dtype=np.uint16)
+        if self.mode == 'change':
+            # dead cells changed too long ago to leave a trail
+            self.ages[~alive] = MAX_AGE
+        return self._repaint()
+
+    def region(self, x, y, width, height):
+        """ (x, y, color) of the cells in a region that are not background """
+        xs, ys = np.nonzero(self.buckets[x:x + width, y:y + height])
+        return list(zip((xs + x).tolist(), (ys + y).tolist(),
+                        [self.colors[bucket] for bucket in
+                         self.buckets[xs + x, ys + y].tolist()]))
+
+    def set_cells(self, cells, states):
+        """
+        The (x, y) cells were set to states, returns (x, y, color) of the
+        newborn or background colour to paint them in
+        """
+        if not cells:
+            return []
+        xs, ys = np.array(cells, dtype=np.intp).T
+        states = np.array(states, dtype=bool)
+        self.alive[xs, ys] = states
+        self.ages[xs, ys] = 0
+        self.buckets[xs, ys] = states
+        return list(zip(xs.tolist(), ys.tolist(),
+                        [self.colors[1] if state else None
+                         for state in states.tolist()]))
+
+    def step(self, changed_cells, generations=1):
+        """
+        Age every cell by generations, the (x, y) changed_cells flipped
+        state and start over at 0. Returns (x, y, color) of every cell whose
+        bucket changed, color None for the background.
+        """
+        generations = min(generations, MAX_AGE)
+        self.ages = np.minimum(self.ages, MAX_AGE - generations)
+        self.ages += generations
+
+        if changed_cells:
+            xs, ys = np.array(changed_cells, dtype=np.intp).T
+            self.alive[xs, ys] ^= True
+            self.ages[xs, ys] = 0
+        if self.mode == 'age':
+            self.ages *= self.alive
+
+        return self._repaint()
+
+    def _repaint(self):
+        buckets = np.searchsorted(self.palette.ages, self.ages,
+                                  side='right').astype(np.uint8)
+        buckets *= self.alive
+        if self.mode == 'change' and self.palette.trail_colors:
+            trail = ~self.alive & (self.ages < len(self.palette.trail_colors))
+            buckets[trail] = (len(self.palette.colors) + 1 +
+                              self.ages[trail])
+
+        xs, ys = np.nonzero(buckets != self.buckets)
+        self.buckets = buckets
+        return list(zip(xs.tolist(), ys.tolist(),
+                        [self.colors[bucket]
+                         for bucket in buckets[xs, ys].tolist()]))
@@ -0,0 +1,155 @@
+"""
+Binary checkpoints of a grid.
+
+A checkpoint is a 64 byte header followed by the cells packed like
+packedengine.PackedGrid: height rows of little-endian 64 bit words, each
+holding 64 cells with x increasing from the lowest bit. The header holds
+the width, height, rules, iteration and topology. load() maps the file
+into memory, so the packed cells are only read from disk as they are used.
+"""
+import mmap
+import struct
+
+import numpy as np
+
+import life
+import packedengine
+
+MAGIC = b'GOLCKPT1'
+
+# width, height, birth mask, survival mask, iteration, topology
+_HEADER = struct.Struct('<IIHHQB')
+HEADER_SIZE = 64
+
+
+class Checkpoint(object):
+    """
+    A loaded checkpoint. words is a copy-on-write view of the packed cells
+    in the mapped file, changing it leaves the file as it is.
+    """
+
+    def __init__(self, width, height, rules, iteration, topology, words,
+                 mapping=None):
+        self.width = width
+        self.height = height
+        self.rules = rules
+        self.iteration = iteration
+        self.topology = topology
+        self.words = words
+        self._mapping = mapping
+
+    def packed(self):
+        """ A PackedGrid sharing the mapped words """
+        return packedengine.PackedGrid.from_words(self.width, self.height,
+                                                  self.words)
+
+    def cells(self):
+        """ Unpacked bool array indexed [x][y] """
+        return self.packed().to_cells()
+
+    def close(self):
+        self.words = None
+        if self._mapping is not None:
+            try:
+                self._mapping.close()
+            except BufferError:
+                # a PackedGrid still uses the words, the mapping is closed
+                # once it is garbage collected
+                pass
+            self._mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write(filename, width, height, words, rules, iteration=0,
+          topology='torus'):
+    """ Write packed words laid out like PackedGrid.words """
+    words = np.ascontiguousarray(words, dtype='<u8')
+    if words.shape != (height, -(-width // packedengine.WORD_BITS)):
+        raise ValueError('Expected {} rows of {} words, got {}'.format(
+            height, -(-width // packedengine.WORD_BITS), words.shape))
+
+    header = MAGIC + _HEADER.pack(width, height, *life.rule_masks(rules),
+                                  iteration, life.TOPOLOGIES.index(topology))
+    with open(filename, 'wb') as f:
+        f.write(header.ljust(HEADER_SIZE, b'\0'))
+        words.tofile(f)
+
+
+def save(grid, filename, rules, iteration=0):
+    """
+    Write a CellGrid, a PackedGrid or any grid indexed [x][y]. Raises
+    ValueError for a grid on a plane, whose cells off the grid would be
+    lost.
+    """
+    topology = getattr(grid, 'topology', 'torus')
+    if topology == 'plane':
+        raise ValueError('Cannot save a checkpoint of a plane, the cells '
+                         'that left the grid would be lost')
+    if isinstance(grid, packedengine.PackedGrid):
+        packed = grid
+    else:
+        cells = np.array(grid, dtype=bool).reshape(
+            len(grid), len(grid[0]) if len(grid) else 0)
+        packed = packedengine.PackedGrid.from_cells(cells)
+    write(filename, packed.width, packed.height, packed.words, rules,
+          iteration, topology)
+
+
+def load(filename):
+    """ Map a checkpoint into memory and return it as a Checkpoint """
+    with open(filename, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE or not header.startswith(MAGIC):
+            raise ValueError('{} is not a checkpoint'.format(filename))
+        (width, height, birth, survival, iteration,
+         topology) = _HEADER.unpack_from(header, len(MAGIC))
+        if topology >= len(life.TOPOLOGIES):
+            raise ValueError('Unknown topology in {}'.format(filename))
+
+        row_words = -(-width // packedengine.WORD_BITS)
+        size = HEADER_SIZE + height * row_words * 8
+        f.seek(0, 2)
+        if f.tell() < size:
+            raise ValueError('{} is truncated'.format(filename))
+
+        mapping = None
+        if height * row_words:
+            mapping = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_COPY)
+            words = np.frombuffer(mapping, dtype='<u8', offset=HEADER_SIZE,
+                                  count=height * row_words)
+        else:
+            words = np.zeros(0, dtype='<u8')
+
+    return Checkpoint(width, height, life.masks_rules(birth, survival),
+                      iteration, life.TOPOLOGIES[topology],
+                      words.reshape(height, row_words), mapping)
+
+
+def restore(grid, filename):
+    """
+    Fill a CellGrid from a checkpoint, cells outside either grid are left
+    out. Returns the Checkpoint, already closed. Raises ValueError if the
+    checkpoint was saved with another topology.
+    """
+    with load(filename) as checkpoint:
+        topology = getattr(grid, 'topology', 'torus')
+        if checkpoint.topology != topology:
+            raise ValueError('{} was saved on a {}, not a {}'.format(
+                filename, checkpoint.topology, topology))
+        cells = checkpoint.cells()
+
+        new_grid = [[False] * grid.height for _ in range(grid.width)]
+        width = min(grid.width, checkpoint.width)
+        height = min(grid.height, checkpoint.height)
+        for x in range(width):
+            new_grid[x][:height] = cells[x, :height].tolist()
+
+    grid.setgrid(new_grid)
+    if grid.engine is not None:
+        grid.engine.reset()
+    return checkpoint
@@ -0,0 +1,115 @@
+from collections import deque, namedtuple
+import hashlib
+import random
+
+
+class Cycle(namedtuple('Cycle', 'start period')):
+    """
+    The grid repeats every period generations from generation start, a
+    period of 1 is a still life
+    """
+
+    @property
+    def still(self):
+        return self.period == 1
+
+    def phase(self, generation):
+        """ Earliest generation with the same cells as generation """
+        if generation < self.start:
+            return generation
+        return self.start + (generation - self.start) % self.period
+
+    def __str__(self):
+        if self.still:
+            return 'Still life from generation {}'.format(self.start)
+        return 'Period {} from generation {}'.format(self.period, self.start)
+
+
+def _array_hash(grid):
+    """
+    64 bit hash of the bytes of a grid held in a numpy array or a
+    PackedGrid's words, None for lists of columns
+    """
+    array = getattr(grid, 'words', grid)
+    if not hasattr(array, 'tobytes'):
+        return None
+    return int.from_bytes(
+        hashlib.blake2b(array.tobytes(), digest_size=8).digest(), 'little')
+
+
+class CycleDetector(object):
+    """
+    Finds repeating grids by Zobrist hashing.
+
+    Every cell has a random 64 bit key and the hash of a grid is the XOR of
+    the keys of its live cells, so it is updated from the changed cells
+    alone. Grids held in numpy arrays or PackedGrids are instead hashed
+    from their bytes every generation. The generations of the last
+    table_size hashes are kept, a grid repeating after longer than that is
+    not noticed.
+    """
+
+    def __init__(self, table_size=4096, seed=0):
+        self.table_size = table_size
+        self.seed = seed
+        self.hash = 0
+        self.cycle = None
+        self._keys = []
+        self._seen = {}
+        self._order = deque()
+        self.valid = False
+
+    def invalidate(self):
+        """ The grid was changed other than by stepping it """
+        self.valid = False
+
+    def rehash(self, grid):
+        """ Hash grid from scratch and forget earlier generations """
+        state = _array_hash(grid)
+        if state is None:
+            if (len(self._keys) != len(grid) or
+                    (self._keys and len(self._keys[0]) != len(grid[0]))):
+                generator = random.Random(self.seed)
+                self._keys = [[generator.getrandbits(64) for _ in column]
+                              for column in grid]
+
+            state = 0
+            for column, keys in zip(grid, self._keys):
+                for alive, key in zip(column, keys):
+                    if alive:
+                        state ^= key
+        self.hash = state
+
+        self.cycle = None
+        self._seen.clear()
+        self._order.clear()
+        self.valid = True
+
+    def observe(self, generation, grid, changed_cells=None):
+        """
+        Add the hash of grid as generation and return the Cycle it
+        completes, if any. changed_cells are the cells that flipped since
+        the previous generation, without them grid is hashed again. Grids
+        in numpy arrays or PackedGrids are hashed whole and need none.
+        """
+        array_hash = _array_hash(grid)
+        if not self.valid or (changed_cells is None and array_hash is None):
+            self.rehash(grid)
+        elif array_hash is not None:
+            self.hash = array_hash
+        else:
+            keys = self._keys
+            for x, y in changed_cells:
+                self.hash ^= keys[x][y]
+
+        first = self._seen.get(self.hash)
+        if first is not None:
+            if self.cycle is None:
+                self.cycle = Cycle(first, generation - first)
+            return self.cycle
+
+        self._seen[self.hash] = generation
+        self._order.append(self.hash)
+        if len(self._order) > self.table_size:
+            del self._seen[self._order.popleft()]
+        return None
@@ -1,22 +1,21 @@
-import random
+"""
+Example draw_func plugin, used by setting [cell] draw_func = drawcell.
 
+A plugin module defines colors(canvas, births, deaths), which is called
+once for every drawn generation. births and deaths are lists of (x, y) of
+the cells that came alive and died, and colors returns a colour for every
+birth, or one colour for all of them. canvas is the CellCanvas, for its
+iteration, cellsize and settings. Plugins do not draw themselves, so they
+work with every renderer.
 
-def func(locals_):
-    x = locals_['x']
-    y = locals_['y']
-    x_canvas = locals_['x_canvas']
-    y_canvas = locals_['y_canvas']
-    cellsize = locals_['self'].cellsize
-    iteration = locals_['self'].iteration
-    tag = locals_['tag']
+Modules with the older func(locals_), called for every cell with the locals
+of the former CellCanvas.draw_cell, still work through
+tklife.legacy_draw_func.
+"""
+import random
 
-    colors = ('#0f0', '#0b0', '#0e4')
+COLORS = ('#0f0', '#0b0', '#0e4')
 
-    color = random.choice(colors)
 
-    locals_['self'].create_rectangle(
-        x_canvas, y_canvas,
-        x_canvas + cellsize,
-        y_canvas + cellsize,
-        fill=color,
-        width=0, tag=tag)
+def colors(canvas, births, deaths):
+    return random.choices(COLORS, k=len(births))
@@ -0,0 +1,330 @@
+from life import Rules
+
+DEFAULT_MAX_NODES = 2 ** 22
+
+
+class Node(object):
+    """
+    Canonical quadtree node, a square of 2 ** level cells.
+    Level 0 nodes are single cells whose population is their state.
+    """
+
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population')
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+
+
+DEAD = Node(None, None, None, None, 0, 0)
+ALIVE = Node(None, None, None, None, 0, 1)
+
+
+class HashLife(object):
+    """
+    Hash-consed quadtree universe on an unbounded plane.
+
+    Identical subtrees are shared, and the centre of every node advanced by
+    a power of two generations is memoized, so regular patterns can be run
+    millions of generations ahead. max_nodes bounds the node table between
+    steps, when it is exceeded the memoized results are dropped and only
+    the nodes reachable from the current universe are kept. A single step
+    may go over it. If the universe alone needs more than half of
+    max_nodes, the limit grows to twice its size.
+    """
+
+    def __init__(self, rules=Rules((3,), (2, 3)), max_nodes=DEFAULT_MAX_NODES):
+        if 0 in rules.b:
+            raise ValueError('HashLife cannot run rules with B0')
+
+        self.rules = rules
+        self.max_nodes = max_nodes
+        self.generation = 0
+
+        self._birth = frozenset(rules.b)
+        self._survival = frozenset(rules.s)
+        self._nodes = {}
+        self._results = {}
+        self._empty_nodes = [DEAD]
+        self._node_limit = max_nodes
+
+        self.root = self._empty(3)
+        # grid coordinates of the top left corner of root
+        self.origin = (-4, -4)
+
+    @classmethod
+    def from_pattern(cls, pattern, **kw):
+        """ Build a universe from a Pattern, using the pattern's rules """
+        universe = cls(pattern.rules, **kw)
+        cells = []
+
+        def add_cell(state, x, y):
+            if state != 'b' and state != 'B':
+                cells.append((x, y))
+
+        pattern.interpret(add_cell)
+        universe.set_cells(cells)
+        return universe
+
+    @classmethod
+    def from_grid(cls, grid, rules, **kw):
+        """
+        Build a universe from a CellGrid, the grid's contents are placed on
+        the plane without wrapping
+        """
+        universe = cls(rules, **kw)
+        universe.set_cells((x, y)
+                           for x in range(grid.width)
+                           for y in range(grid.height)
+                           if grid[x][y])
+        return universe
+
+    def set_cells(self, cells):
+        """ Replace the universe with the given live (x, y) cells """
+        cells = set(cells)
+        if not cells:
+            self.root = self._empty(3)
+            self.origin = (-4, -4)
+            return
+
+        xmin = min(x for x, _ in cells)
+        ymin = min(y for _, y in cells)
+        size = max(max(x for x, _ in cells) - xmin,
+                   max(y for _, y in cells) - ymin) + 1
+
+        level = max(3, (size - 1).bit_length())
+
+        # merge cells into parents a level at a time
+        nodes = {(x - xmin, y - ymin): ALIVE for x, y in cells}
+        for current in range(level):
+            empty = self._empty(current)
+            parents = {}
+            for x, y in nodes:
+                parent = (x >> 1, y >> 1)
+                if parent in parents:
+                    continue
+                px, py = parent[0] << 1, parent[1] << 1
+                parents[parent] = self._join(
+                    nodes.get((px, py), empty),
+                    nodes.get((px + 1, py), empty),
+                    nodes.get((px, py + 1), empty),
+                    nodes.get((px + 1, py + 1), empty))
+            nodes = parents
+
+        self.root = nodes[(0, 0)]
+        self.origin = (xmin, ymin)
+
+    def step(self, k):
+        """ Advance the universe by 2 ** k generations """
+        # collecting during a step would drop the nodes it is building
+        if len(self._nodes) > self._node_limit:
+            self._collect()
+
+        node = self.root
+        x, y = self.origin
+        while node.level < k + 3 or not self._padded(node):
+            x -= 1 << (node.level - 1)
+            y -= 1 << (node.level - 1)
+            node = self._expand(node)
+
+        result = self._successor(node, k)
+        quarter = 1 << (node.level - 2)
+
+        self.root = result
+        self.origin = (x + quarter, y + quarter)
+        self.generation += 1 << k
+
+    def advance(self, generations):
+        """ Advance the universe by any number of generations """
+        k = 0
+        while generations:
+            if generations & 1:
+                self.step(k)
+            generations >>= 1
+            k += 1
+
+    @property
+    def population(self):
+        return self.root.population
+
+    @property
+    def node_count(self):
+        return len(self._nodes)
+
+    @property
+    def bounding_box(self):
+        """ (xmin, ymin, xmax, ymax) of the live cells, None if empty """
+        box = self._box(self.root, {})
+        if box is None:
+            return None
+        x, y = self.origin
+        return (x + box[0], y + box[1], x + box[2], y + box[3])
+
+    def live_cells(self):
+        """ Yield the (x, y) coordinates of every live cell """
+        stack = [(self.root,) + self.origin]
+        while stack:
+            node, x, y = stack.pop()
+            if node.population == 0:
+                continue
+            if node.level == 0:
+                yield (x, y)
+                continue
+            half = 1 << (node.level - 1)
+            stack.append((node.se, x + half, y + half))
+            stack.append((node.sw, x, y + half))
+            stack.append((node.ne, x + half, y))
+            stack.append((node.nw, x, y))
+
+    def _join(self, nw, ne, sw, se):
+        key = (nw, ne, sw, se)
+        try:
+            return self._nodes[key]
+        except KeyError:
+            pass
+
+        node = Node(nw, ne, sw, se, nw.level + 1,
+                    nw.population + ne.population +
+                    sw.population + se.population)
+        self._nodes[key] = node
+        return node
+
+    def _empty(self, level):
+        while len(self._empty_nodes) <= level:
+            smaller = self._empty_nodes[-1]
+            self._empty_nodes.append(
+                self._join(smaller, smaller, smaller, smaller))
+        return self._empty_nodes[level]
+
+    def _expand(self, node):
+        """ Centre node in an empty node one level up """
+        empty = self._empty(node.level - 1)
+        return self._join(
+            self._join(empty, empty, empty, node.nw),
+            self._join(empty, empty, node.ne, empty),
+            self._join(empty, node.sw, empty, empty),
+            self._join(node.se, empty, empty, empty))
+
+    @staticmethod
+    def _padded(node):
+        """ True if every live cell of node is inside its inner quarter """
+        return node.population == (node.nw.se.se.population +
+                                   node.ne.sw.sw.population +
+                                   node.sw.ne.ne.population +
+                                   node.se.nw.nw.population)
+
+    def _successor(self, node, j):
+        """
+        Centre half of node advanced 2 ** min(j, node.level - 2)
+        generations
+        """
+        if node.population == 0:
+            return node.nw
+
+        j = min(j, node.level - 2)
+        key = (node, j)
+        try:
+            return self._results[key]
+        except KeyError:
+            pass
+
+        if node.level == 2:
+            result = self._base_case(node)
+        else:
+            join = self._join
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+
+            c1 = self._successor(nw, j)
+            c2 = self._successor(join(nw.ne, ne.nw, nw.se, ne.sw), j)
+            c3 = self._successor(ne, j)
+            c4 = self._successor(join(nw.sw, nw.se, sw.nw, sw.ne), j)
+            c5 = self._successor(join(nw.se, ne.sw, sw.ne, se.nw), j)
+            c6 = self._successor(join(ne.sw, ne.se, se.nw, se.ne), j)
+            c7 = self._successor(sw, j)
+            c8 = self._successor(join(sw.ne, se.nw, sw.se, se.sw), j)
+            c9 = self._successor(se, j)
+
+            if j < node.level - 2:
+                result = join(join(c1.se, c2.sw, c4.ne, c5.nw),
+                              join(c2.se, c3.sw, c5.ne, c6.nw),
+                              join(c4.se, c5.sw, c7.ne, c8.nw),
+                              join(c5.se, c6.sw, c8.ne, c9.nw))
+            else:
+                result = join(self._successor(join(c1, c2, c4, c5), j),
+                              self._successor(join(c2, c3, c5, c6), j),
+                              self._successor(join(c4, c5, c7, c8), j),
+                              self._successor(join(c5, c6, c8, c9), j))
+
+        self._results[key] = result
+        return result
+
+    def _base_case(self, node):
+        """ Centre 2x2 of a 4x4 node after one generation """
+        cells = [[0] * 4 for _ in range(4)]
+        for qy, row in ((0, (node.nw, node.ne)), (2, (node.sw, node.se))):
+            for qx, quad in zip((0, 2), row):
+                cells[qy][qx] = quad.nw.population
+                cells[qy][qx + 1] = quad.ne.population
+                cells[qy + 1][qx] = quad.sw.population
+                cells[qy + 1][qx + 1] = quad.se.population
+
+        def next_state(x, y):
+            count = (sum(cells[y - 1][x - 1:x + 2]) +
+                     sum(cells[y + 1][x - 1:x + 2]) +
+                     cells[y][x - 1] + cells[y][x + 1])
+            if cells[y][x]:
+                return ALIVE if count in self._survival else DEAD
+            return ALIVE if count in self._birth else DEAD
+
+        return self._join(next_state(1, 1), next_state(2, 1),
+                          next_state(1, 2), next_state(2, 2))
+
+    def _collect(self):
+        """ Drop memoized results and every node not reachable from root """
+        reachable = {}
+        stack = [self.root] + self._empty_nodes[1:]
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key in reachable:
+                continue
+            reachable[key] = node
+            stack.extend(key)
+
+        self._nodes = reachable
+        self._results.clear()
+        self._node_limit = max(self.max_nodes, 2 * len(reachable))
+
+    def _box(self, node, memo):
+        if node.population == 0:
+            return None
+        if node.level == 0:
+            return (0, 0, 0, 0)
+        try:
+            return memo[node]
+        except KeyError:
+            pass
+
+        half = 1 << (node.level - 1)
+        box = None
+        for quad, dx, dy in ((node.nw, 0, 0), (node.ne, half, 0),
+                             (node.sw, 0, half), (node.se, half, half)):
+            quad_box = self._box(quad, memo)
+            if quad_box is None:
+                continue
+            quad_box = (quad_box[0] + dx, quad_box[1] + dy,
+                        quad_box[2] + dx, quad_box[3] + dy)
+            if box is None:
+                box = quad_box
+            else:
+                box = (min(box[0], quad_box[0]), min(box[1], quad_box[1]),
+                       max(box[2], quad_box[2]), max(box[3], quad_box[3]))
+
+        memo[node] = box
+        return box
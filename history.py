@@ -0,0 +1,200 @@
+from array import array
+from collections import deque
+import zlib
+
+
+def pack_grid(grid):
+    """ One byte per cell, column by column """
+    return b''.join(map(bytes, grid))
+
+
+def _differences(a, b):
+    """ Indices of the bytes that differ between two packed grids """
+    flipped = (int.from_bytes(a, 'little') ^
+               int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+    found = []
+    index = flipped.find(1)
+    while index != -1:
+        found.append(index)
+        index = flipped.find(1, index + 1)
+    return found
+
+
+class History(object):
+    """
+    Bounded store of past generations.
+
+    Every generation recorded straight after the one before it keeps the
+    indices of the cells that changed in that step, so moving between
+    generations costs the cells that changed on the way. Every
+    keyframe_interval generations, after any gap and after edits the whole
+    grid is also kept as a compressed keyframe to start from. When the
+    entries grow past memory_limit bytes the oldest keyframes are dropped
+    with the generations after them.
+    """
+
+    def __init__(self, memory_limit, keyframe_interval=64):
+        self.memory_limit = memory_limit
+        self.keyframe_interval = keyframe_interval
+        self.clear()
+
+    def clear(self):
+        # generation -> [compressed keyframe or None, changed indices or None]
+        self._entries = {}
+        self._order = deque()
+        self._stored = 0
+        self._shape = None
+        self._last_keyframe = None
+        # generation the grid was last recorded or sought at
+        self._current = None
+
+    def invalidate(self):
+        """ The grid was edited, the next record needs a keyframe """
+        self._current = None
+
+    def __len__(self):
+        return len(self._order)
+
+    @property
+    def memory(self):
+        """ Bytes held by keyframes and changed cell indices """
+        return self._stored
+
+    @property
+    def current(self):
+        """ Generation last recorded or sought """
+        return self._current
+
+    @property
+    def newest(self):
+        if not self._order:
+            return None
+        return self._order[-1]
+
+    @property
+    def oldest(self):
+        if not self._order:
+            return None
+        return self._order[0]
+
+    def __contains__(self, generation):
+        return generation in self._entries
+
+    def previous(self, generation):
+        """ Newest retained generation before generation, or None """
+        for retained in reversed(self._order):
+            if retained < generation:
+                return retained
+        return None
+
+    def record(self, generation, grid, changed_cells=None):
+        """
+        Store grid as the given generation, forgetting any generations
+        from it onwards. changed_cells are the (x, y) cells that flipped
+        since the generation before, which must have been the last one
+        recorded or sought.
+        """
+        height = len(grid[0]) if len(grid) else 0
+        if (len(grid), height) != self._shape:
+            self.clear()
+            self._shape = (len(grid), height)
+
+        self._truncate(generation)
+
+        changes = None
+        if (changed_cells is not None and
+                self._current == generation - 1 and
+                generation - 1 in self._entries):
+            changes = array('I', [x * height + y for x, y in changed_cells])
+
+        keyframe = None
+        if (changes is None or
+                generation - self._last_keyframe >= self.keyframe_interval):
+            keyframe = zlib.compress(pack_grid(grid), 1)
+            self._last_keyframe = generation
+
+        self._entries[generation] = [keyframe, changes]
+        self._order.append(generation)
+        self._stored += self._size(keyframe, changes)
+        self._current = generation
+        self._evict()
+
+    def seek(self, generation, grid):
+        """
+        The (x, y) cells to flip to turn grid, the generation last recorded
+        or sought, into a retained generation
+        """
+        if generation not in self._entries:
+            raise KeyError(generation)
+
+        start = self._current
+        if start is None or not self._linked(start, generation):
+            start = self._nearest_keyframe(generation)
+            flipped = set(_differences(
+                zlib.decompress(self._entries[start][0]), pack_grid(grid)))
+        else:
+            flipped = set()
+
+        # a step's changes flip the same cells going either way
+        low, high = sorted((start, generation))
+        for step in range(low + 1, high + 1):
+            flipped.symmetric_difference_update(self._entries[step][1])
+
+        self._current = generation
+        height = self._shape[1]
+        return [divmod(index, height) for index in flipped]
+
+    def _linked(self, start, generation):
+        """ True if the changes of every step between them are kept """
+        low, high = sorted((start, generation))
+        entries = self._entries
+        return all(step in entries and entries[step][1] is not None
+                   for step in range(low + 1, high + 1))
+
+    def _nearest_keyframe(self, generation):
+        """ Keyframe that generation is linked to, the closest one first """
+        keyframes = sorted((step for step, (keyframe, _) in
+                            self._entries.items() if keyframe is not None),
+                           key=lambda step: abs(step - generation))
+        for step in keyframes:
+            if self._linked(step, generation):
+                return step
+        raise KeyError(generation)
+
+    @staticmethod
+    def _size(keyframe, changes):
+        size = 0 if keyframe is None else len(keyframe)
+        if changes is not None:
+            size += len(changes) * changes.itemsize
+        return size
+
+    def _remove(self, generation):
+        self._stored -= self._size(*self._entries.pop(generation))
+
+    def _truncate(self, generation):
+        while self._order and self._order[-1] >= generation:
+            self._remove(self._order.pop())
+        if self._current is not None and self._current >= generation:
+            self._current = None
+        if self._last_keyframe is not None and \
+                self._last_keyframe >= generation:
+            self._last_keyframe = max(
+                (step for step, (keyframe, _) in self._entries.items()
+                 if keyframe is not None), default=None)
+
+    def _evict(self):
+        """
+        Drop the oldest keyframe with the generations up to the next one
+        until under the memory limit, always keeping the newest keyframe
+        """
+        entries = self._entries
+        while self._stored > self.memory_limit and \
+                self._last_keyframe != self._order[0]:
+            self._remove(self._order.popleft())
+            while entries[self._order[0]][0] is None:
+                self._remove(self._order.popleft())
+
+            # the oldest keyframe has no earlier generation to step back to
+            oldest = entries[self._order[0]]
+            self._stored -= self._size(None, oldest[1])
+            oldest[1] = None
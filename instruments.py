@@ -0,0 +1,121 @@
+"""
+Timings of generations and ticks for anyone who asks for them.
+
+Code being measured asks Instruments for a timer, marks the end of each of
+its phases with lap() and hands the finished record to emit(). Hooks are
+called with every record. Without hooks the timer is a shared no-op, so
+instrumented code costs a few method calls.
+"""
+from collections import deque
+import time
+
+
+class PhaseTimer(object):
+    """ Seconds spent in each named phase, on the monotonic clock """
+
+    def __init__(self):
+        self.phases = {}
+        self._last = time.perf_counter()
+
+    def lap(self, phase):
+        """ End phase, which started when the previous one ended """
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def __bool__(self):
+        return True
+
+
+class _NullTimer(object):
+    phases = {}
+
+    def lap(self, phase):
+        pass
+
+    def __bool__(self):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Instruments(object):
+    """
+    Hooks receiving a dict for every measured generation or tick. Records
+    have a 'source' and a 'phases' dict of seconds, the rest depends on
+    the source.
+    """
+
+    def __init__(self):
+        self.hooks = []
+
+    @property
+    def enabled(self):
+        return bool(self.hooks)
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def timer(self):
+        """ A PhaseTimer, or a timer that does nothing when disabled """
+        if self.hooks:
+            return PhaseTimer()
+        return NULL_TIMER
+
+    def emit(self, source, timer, **values):
+        record = dict(values, source=source, phases=timer.phases)
+        for hook in self.hooks:
+            hook(record)
+
+
+def percentile(ordered, fraction):
+    """ Nearest rank percentile of a sorted sequence """
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction *
+                                                   len(ordered))) - 1))
+    return ordered[index]
+
+
+class RollingStats(object):
+    """ Hook keeping the phase timings of the last window records """
+
+    def __init__(self, window=200):
+        self.window = window
+        self.phases = {}
+        self.latest = {}
+
+    def __call__(self, record):
+        source = record['source']
+        for phase, seconds in record['phases'].items():
+            key = (source, phase)
+            if key not in self.phases:
+                self.phases[key] = deque(maxlen=self.window)
+            self.phases[key].append(seconds)
+        self.latest[source] = record
+
+    def summary(self):
+        """ {(source, phase): (p50, p99)} in seconds """
+        result = {}
+        for key, times in self.phases.items():
+            ordered = sorted(times)
+            result[key] = (percentile(ordered, 0.5),
+                           percentile(ordered, 0.99))
+        return result
+
+    def report(self):
+        """ Lines of text with p50 and p99 per phase in milliseconds """
+        lines = []
+        for (source, phase), (p50, p99) in sorted(self.summary().items()):
+            lines.append('{:<24} p50 {:7.2f} ms  p99 {:7.2f} ms'.format(
+                '{}/{}'.format(source, phase), p50 * 1000, p99 * 1000))
+
+        generation = self.latest.get('new_gen')
+        if generation is not None:
+            lines.append('population {population}  changed {changed}  '
+                         'items {items}'.format(**generation))
+        return '\n'.join(lines)
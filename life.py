@@ -1,8 +1,91 @@
+from array import array
 from collections import namedtuple
+import re
 
 Rules = namedtuple('Rules', 'b s')
 
 
+def parse_rules(rule_string):
+    """ Parse a B3/S23, S23/B3 or 23/3 (survival/birth) rule string """
+    rules = rule_string.strip().split('/')
+    if len(rules) != 2:
+        raise ValueError('Invalid rule string: {}'.format(rule_string))
+
+    if rules[0][:1].casefold() == 'b':
+        birth_string = rules[0][1:]
+        survival_string = rules[1][1:]
+    elif rules[0][:1].casefold() == 's':
+        birth_string = rules[1][1:]
+        survival_string = rules[0][1:]
+    else:
+        birth_string = rules[1]
+        survival_string = rules[0]
+
+    birth_rule = []
+    for character in birth_string:
+        birth_rule.append(int(character))
+
+    survival_rule = []
+    for character in survival_string:
+        survival_rule.append(int(character))
+
+    return Rules(tuple(birth_rule), tuple(survival_rule))
+
+
+def format_rules(rules):
+    """ Format rules as a B3/S23 rule string """
+    return 'B{}/S{}'.format(''.join(str(rule) for rule in sorted(rules.b)),
+                            ''.join(str(rule) for rule in sorted(rules.s)))
+
+
+def rule_masks(rules):
+    """ Birth and survival neighbour counts as (birth, survival) bit masks """
+    masks = []
+    for ruleset in (rules.b, rules.s):
+        mask = 0
+        for rule in ruleset:
+            mask |= 1 << rule
+        masks.append(mask)
+    return tuple(masks)
+
+
+def masks_rules(birth_mask, survival_mask):
+    """ Rules from the bit masks made by rule_masks """
+    return Rules(*(tuple(rule for rule in range(16) if mask >> rule & 1)
+                   for mask in (birth_mask, survival_mask)))
+
+
+def read_rule_list(filename):
+    """
+    Read (name, Rules) pairs from a file like cool_rules.txt, a name line
+    followed by a rule line with blank lines between entries
+    """
+    with open(filename) as f:
+        lines = [line.strip() for line in f]
+
+    entries = []
+    name = None
+    for line in lines:
+        if not line:
+            continue
+        if name is None:
+            name = line
+        else:
+            entries.append((name, parse_rules(line)))
+            name = None
+    if name is not None:
+        raise ValueError('No rule string for {} in {}'.format(name,
+                                                              filename))
+    return entries
+
+
+def write_rule_list(filename, entries):
+    """ Write (name, Rules) pairs in the format read by read_rule_list """
+    with open(filename, 'w') as f:
+        f.write('\n'.join('{}\n{}\n'.format(name, format_rules(rules))
+                          for name, rules in entries))
+
+
 class Pattern(namedtuple('Pattern', 'width height rules commands')):
 
     Command = namedtuple('Command', 'length state')
@@ -18,6 +101,32 @@ class Pattern(namedtuple('Pattern', 'width height rules commands')):
     def center_y(self):
         return int((self.height - 1) / 2)
 
+    def stamp(self, xflipped=False, yflipped=False, rotation=0):
+        """
+        Tuple of the (x, y) offsets of the live cells interpret visits,
+        compiled once per orientation
+        """
+        try:
+            stamps = self._stamps
+        except AttributeError:
+            stamps = self._stamps = {}
+
+        orientation = (xflipped, yflipped, rotation)
+        try:
+            return stamps[orientation]
+        except KeyError:
+            pass
+
+        cells = []
+
+        def add_cell(state, x, y):
+            if state != 'b' and state != 'B':
+                cells.append((x, y))
+
+        Pattern.interpret(self, add_cell, *orientation)
+        stamps[orientation] = tuple(cells)
+        return stamps[orientation]
+
     def interpret(self, interpreter_func,
                   xflipped=False, yflipped=False,
                   rotation=0):
@@ -61,98 +170,185 @@ class Pattern(namedtuple('Pattern', 'width height rules commands')):
 
         x = 0
         y = 0
-        for command in self.commands:
-            if command.state == '$':
+        for length, state in self.commands:
+            if state == '$':
                 x = 0
-                y += yflip * command.length
+                y += yflip * length
             else:
-                for _ in range(command.length):
-                    f(command.state, x, y)
+                for _ in range(length):
+                    f(state, x, y)
                     x += xflip
 
     @staticmethod
     def parsefile(filename):
+        """
+        Parse an RLE file into a (name, Pattern) tuple, reading the run
+        data in chunks. Raises PatternParseError for malformed files.
+        """
         with open(filename, 'r') as f:
             pattern_name = None
+            line_number = 0
 
             # look for name comment and get header
-            header = f.readline().strip()
-            while header.startswith('#'):
-                if header.startswith('#N'):
-                    pattern_name = header[2:].strip()
-                header = f.readline().strip()
-            header = header.replace(' ', '')
+            header = ''
+            for line in f:
+                line_number += 1
+                line = line.strip()
+                if line.startswith('#N'):
+                    pattern_name = line[2:].strip()
+                elif line and not line.startswith('#'):
+                    header = line
+                    break
 
             if pattern_name is None:
                 pattern_name = f.name[:f.name.rfind('.')]
                 pattern_name = pattern_name.rsplit('\\', 1)[-1]
                 pattern_name = pattern_name.rsplit('/', 1)[-1]
-            headerparts = header.split(',')
 
-            pattern_width = int(headerparts[0][2:])
-            pattern_height = int(headerparts[1][2:])
+            def header_error(message):
+                return PatternParseError(message, filename, line_number)
 
-            if headerparts[2] is None:
-                pattern_rules = Rules([3], [2, 3])
+            width_match = _HEADER_WIDTH.search(header)
+            height_match = _HEADER_HEIGHT.search(header)
+            if width_match is None or height_match is None:
+                raise header_error('expected an "x = .., y = .." header')
+            pattern_width = int(width_match.group(1))
+            pattern_height = int(height_match.group(1))
+
+            rule_match = _HEADER_RULE.search(header)
+            if rule_match is None:
+                pattern_rules = Rules((3,), (2, 3))
             else:
-                rules = headerparts[2].replace('rule=', '').split('/')
-                if rules[0][0].casefold() == 'b':
-                    birth_string = rules[0][1:]
-                    survival_string = rules[1][1:]
-                elif rules[0][0].casefold() == 's':
-                    birth_string = rules[1][1:]
-                    survival_string = rules[0][1:]
+                try:
+                    pattern_rules = parse_rules(rule_match.group(1))
+                except ValueError:
+                    raise header_error('unsupported rule {}'.format(
+                        rule_match.group(1)))
+
+            # length is amount of, $ is new line, b or B=dead cell,
+            # any other character is alive cell
+            runs = RunList()
+            pending = ''
+            length_prefix = ''
+            finished = False
+            # line_number is the line of the last character read, the run
+            # data starts on the line after the header
+            line_started = False
+            while not finished:
+                chunk = f.read(CHUNK_SIZE)
+                data = pending + chunk
+
+                # only whole lines can be checked for comments, unless the
+                # line is too long to wait for
+                cut = data.rfind('\n') + 1
+                if not chunk:
+                    cut = len(data)
+                elif cut == 0 and not data.startswith('#'):
+                    cut = len(data)
+                pending = data[cut:]
+                data = data[:cut]
+                if '#' in data:
+                    # comments are cut out up to their newlines
+                    data = _COMMENT_LINE.sub('', data)
+
+                end = data.find('!')
+                if end != -1:
+                    data = data[:end + 1]
+                    finished = True
+                elif not chunk:
+                    finished = True
+
+                if data:
+                    line_number += (data.count('\n') - data.endswith('\n') +
+                                    (not line_started))
+                    line_started = not data.endswith('\n')
+                data = length_prefix + ''.join(data.split()).rstrip('!')
+
+                # digits may continue on the next line
+                digits = len(data) - len(data.rstrip('0123456789'))
+                if digits and not finished:
+                    length_prefix = data[-digits:]
+                    data = data[:-digits]
                 else:
-                    birth_string = rules[1]
-                    survival_string = rules[0]
+                    length_prefix = ''
 
-                birth_rule = []
-                for character in birth_string:
-                    birth_rule.append(int(character))
+                runs.extend(data)
 
-                survival_rule = []
-                for character in survival_string:
-                    survival_rule.append(int(character))
+            # a run length at the very end has no state to go with it
+            if len(runs) != len(runs.states):
+                raise PatternParseError('run length without a state at the '
+                                        'end of the run data', filename,
+                                        line_number)
 
-                pattern_rules = Rules(tuple(birth_rule), tuple(survival_rule))
+        return (pattern_name, Pattern(pattern_width, pattern_height,
+                                      pattern_rules, runs))
 
-            def parse_commands(line):
-                parsed_commands = []
-                length = ''
 
-                for character in line:
-                    if character.isdigit():
-                        length += character
-                    else:
-                        if length == '':
-                            command = Pattern.Command(1, character)
-                        else:
-                            command = Pattern.Command(int(length), character)
+class PatternParseError(ValueError):
+    def __init__(self, message, filename, line_number):
+        super().__init__('{}:{}: {}'.format(filename, line_number, message))
+        self.filename = filename
+        self.line_number = line_number
 
-                        parsed_commands.append(command)
-                        length = ''
 
-                return parsed_commands
+# characters read from an RLE file at a time
+CHUNK_SIZE = 1 << 20
 
-            # length is amount of, $ is new line, b or B=dead cell,
-            # any other character is alive cell
-            pattern_commands = []
-            unparsed_line = f.readline().strip().replace(' ', '')
+_HEADER_WIDTH = re.compile(r'\bx\s*=\s*(\d+)')
+_HEADER_HEIGHT = re.compile(r'\by\s*=\s*(\d+)')
+# rule strings may carry a bounded grid suffix like B3/S23:T100,100
+_HEADER_RULE = re.compile(r'\brule\s*=\s*([^\s:,]+)', re.IGNORECASE)
+_COMMENT_LINE = re.compile(r'^[ \t]*#.*$', re.MULTILINE)
+_DIGITS = b'0123456789'
+# maps every byte that is not a digit to a space
+_STATES_TO_SPACES = bytes(byte if byte in _DIGITS else ord(' ')
+                          for byte in range(256))
 
-            while unparsed_line[-1] != '!':
-                line_to_process = unparsed_line
-                unparsed_line = ''
-                while (line_to_process[-1].isdigit()):
-                    unparsed_line = line_to_process[-1] + unparsed_line
 
-                pattern_commands.extend(parse_commands(line_to_process))
+class RunList(object):
+    """
+    Pattern commands stored compactly, the run lengths in an array and one
+    state character per run. Iterating yields Pattern.Command tuples.
+    """
 
-                unparsed_line += f.readline().strip().replace(' ', '')
+    __slots__ = ('lengths', '_states')
 
-            pattern_commands.extend(parse_commands(unparsed_line[:-1]))
+    def __init__(self):
+        self.lengths = array('I')
+        self._states = []
 
-        return (pattern_name, Pattern(pattern_width, pattern_height,
-                                      pattern_rules, pattern_commands))
+    @classmethod
+    def from_runs(cls, lengths, states):
+        """ RunList of a length array and a string of states """
+        runs = cls()
+        runs.lengths = lengths
+        runs._states = [states]
+        return runs
+
+    @property
+    def states(self):
+        if len(self._states) != 1:
+            self._states = [''.join(self._states)]
+        return self._states[0]
+
+    def extend(self, data):
+        """ Add the runs of whitespace free RLE data ending with a state """
+        if not data:
+            return
+        data = data.encode('latin-1', 'replace')
+
+        # one space follows every run length, a missing length means 1
+        lengths = b' ' + data.translate(_STATES_TO_SPACES)
+        lengths = lengths.replace(b'  ', b' 1 ').replace(b'  ', b' 1 ')
+        self.lengths.extend(map(int, lengths.split()))
+
+        self._states.append(data.translate(None, _DIGITS).decode('latin-1'))
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __iter__(self):
+        return map(Pattern.Command._make, zip(self.lengths, self.states))
 
 
 class Selection(Pattern):
@@ -161,8 +357,20 @@ class Selection(Pattern):
         new_selection.xflipped = False
         new_selection.yflipped = False
         new_selection.rotation = 0
+
+        # share compiled stamps with the pattern
+        try:
+            new_selection._stamps = pattern._stamps
+        except AttributeError:
+            new_selection._stamps = {}
+            if isinstance(pattern, Pattern):
+                pattern._stamps = new_selection._stamps
         return new_selection
 
+    @property
+    def orientation(self):
+        return (self.xflipped, self.yflipped, self.rotation)
+
     def horizontal_flip(self):
         if self.rotation % 2 == 0:
             self.xflipped ^= True
@@ -183,15 +391,73 @@ class Selection(Pattern):
                           self.xflipped, self.yflipped,
                           self.rotation)
 
+    def stamp(self):
+        return super().stamp(*self.orientation)
+
 MOORE_NEIGHBOURHOOD = (
     (-1, -1), (0, -1), (1, -1),
     (-1, 0), (1, 0),
     (-1, 1), (0, 1), (1, 1))
 
+# engine name -> module providing an Engine class, None is the built-in engine
+ENGINES = {
+    'python': None,
+    'numpy': 'numpyengine',
+    'packed': 'packedengine',
+    'tiled': 'tileengine',
+    'sparse': 'sparseengine',
+    'parallel': 'parallelengine',
+}
+
+# torus wraps around the grid edges, plane extends the grid without bound
+TOPOLOGIES = ('torus', 'plane')
+
+
+class Engine(object):
+    """
+    Base for CellGrid stepping engines. Engines that track changes return
+    the (x, y) cells that flipped from next_generation.
+    """
+
+    topologies = ('torus',)
+    tracks_changes = False
+
+    def __init__(self, grid, **options):
+        self.grid = grid
+
+    def next_generation(self, rules):
+        raise NotImplementedError
+
+    def check_rules(self, rules):
+        """ Raise ValueError if the engine cannot run rules on its grid """
+
+    def cell_changed(self, x, y):
+        """ Called when a single cell was set outside of the engine """
+
+    def reset(self):
+        """ Called after the grid was cleared, replaced or resized """
+
+    def close(self):
+        """ Release processes or memory held outside of the grid """
+
+
+def load_engine(name):
+    """ Import and return the Engine class registered under name """
+    try:
+        module_name = ENGINES[name]
+    except KeyError:
+        raise ValueError('Unknown engine: {}'.format(name))
+
+    if module_name is None:
+        return None
+    return __import__(module_name).Engine
+
 
 class CellGrid(list):
-    def __init__(self, cellsize, widthfunc, heightfunc):
+    def __init__(self, cellsize, widthfunc, heightfunc,
+                 engine='python', topology='torus', engine_options=None):
         self._cellsize = cellsize
+        self.topology = topology
 
         # width and height are relative to cellsize, get functions to be able
         # to evaluate width and height
@@ -202,6 +468,23 @@ class CellGrid(list):
 
         super().__init__(self._new_grid())
 
+        if topology not in TOPOLOGIES:
+            raise ValueError('Unknown topology: {}'.format(topology))
+
+        engine_class = load_engine(engine)
+        if engine_class is None:
+            topologies = Engine.topologies
+        else:
+            topologies = engine_class.topologies
+        if topology not in topologies:
+            raise ValueError('Engine {} does not support the {} topology'
+                             .format(engine, topology))
+
+        if engine_class is None:
+            self.engine = None
+        else:
+            self.engine = engine_class(self, **(engine_options or {}))
+
     def cell_next_generation(self, x, y, rules):
         alive_neighbour_count = 0
 
@@ -222,12 +505,38 @@ class CellGrid(list):
         return False
 
     def next_generation(self, rules):
+        if self.engine is not None:
+            return self.engine.next_generation(rules)
+
         self.setgrid(
             [[self.cell_next_generation(x, y, rules)
               for y in range(self.height)]
              for x in range(self.width)]
             )
 
+    def check_rules(self, rules):
+        """ Raise ValueError if rules cannot run on this grid """
+        if self.engine is not None:
+            self.engine.check_rules(rules)
+
+    def step(self, rules):
+        """ Run one generation and return the (x, y) cells that changed """
+        if self.engine is not None and self.engine.tracks_changes:
+            return self.next_generation(rules)
+
+        prev_generation = self.copy_grid()
+        self.next_generation(rules)
+        return self.changed_cells(prev_generation)
+
+    def changed_cells(self, prev_generation):
+        """ (x, y) of every cell that differs from prev_generation """
+        return [(x, y)
+                for x, (column, prev_column)
+                in enumerate(zip(self, prev_generation))
+                if column != prev_column
+                for y in range(len(column))
+                if column[y] != prev_column[y]]
+
     def grid(self, scalar):
         """ Convert canvas to grid scalar """
         return int(scalar / self.cellsize)
@@ -246,12 +555,28 @@ class CellGrid(list):
         self.clear()
         self.extend(newgrid)
 
+    def set_cell(self, x, y, state):
+        self[x][y] = state
+        if self.engine is not None:
+            self.engine.cell_changed(x, y)
+
     def reset(self):
         self.setgrid(self._new_grid())
+        if self.engine is not None:
+            self.engine.reset()
+
+    def close(self):
+        """ Release what the engine holds, the grid can still be read """
+        if self.engine is not None:
+            self.engine.close()
 
     def copy_grid(self):
         return [col[:] for col in self]
 
+    @property
+    def population(self):
+        return sum(map(sum, self))
+
     @property
     def cellsize(self):
         return self._cellsize
@@ -0,0 +1,308 @@
+"""
+Run Game of Life simulations without a display.
+
+    python lifecli.py --size 200x200 --rule B3/S23 --generations 1000
+    python lifecli.py --rle gun.rle --engine numpy --generations 5000 \\
+        --output final.cells --snapshot-every 500
+"""
+import argparse
+import random
+import sys
+import time
+
+import cycles
+import life
+
+
+def parse_size(size_string):
+    width, _, height = size_string.casefold().partition('x')
+    try:
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'size must look like WIDTHxHEIGHT, not {}'.format(size_string))
+
+
+def parse_rule_argument(rule_string):
+    try:
+        return life.parse_rules(rule_string)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def fixed_grid(width, height, engine='python', topology='torus',
+               engine_options=None):
+    """ A CellGrid of a fixed size, without a screen to measure """
+    return life.CellGrid(1, lambda _: width, lambda _: height,
+                         engine, topology, engine_options)
+
+
+def stepped_grid(width, height, engine='python', topology='torus',
+                 engine_options=None):
+    """
+    The grid to run, a fixed_grid or for the packed and parallel engines
+    their PackedGrid or ParallelStepper stepped on its own, without the
+    lists of a CellGrid beside it
+    """
+    if engine not in ('packed', 'parallel'):
+        return fixed_grid(width, height, engine, topology, engine_options)
+
+    if topology not in life.load_engine(engine).topologies:
+        raise ValueError('Engine {} does not support the {} topology'
+                         .format(engine, topology))
+    if engine == 'packed':
+        import packedengine
+        return packedengine.PackedGrid(width, height)
+    import parallelengine
+    return parallelengine.ParallelStepper(width, height,
+                                          **(engine_options or {}))
+
+
+def current_cells(grid):
+    """ The cells of a stepped_grid to write or hash """
+    # a ParallelStepper's cells are in whichever buffer is current
+    return getattr(grid, 'cells', grid)
+
+
+def set_live(grid, cells):
+    """ Set the (x, y) cells alive in a stepped_grid """
+    if isinstance(grid, life.CellGrid):
+        for x, y in cells:
+            grid.set_cell(x, y, True)
+    elif cells:
+        grid.set_live_cells(*zip(*cells))
+
+
+def place_pattern(grid, pattern):
+    """ Place pattern in the middle of grid, wrapping at the edges """
+    xstart = int(grid.width / 2) - pattern.center_x
+    ystart = int(grid.height / 2) - pattern.center_y
+    cells = []
+
+    def place_cell(state, x, y):
+        if state != 'b' and state != 'B':
+            cells.append(((xstart + x) % grid.width,
+                          (ystart + y) % grid.height))
+
+    pattern.interpret(place_cell)
+    set_live(grid, cells)
+
+
+def randomize(grid, density, seed=None):
+    generator = random.Random(seed)
+    for x in range(grid.width):
+        set_live(grid, [(x, y) for y in range(grid.height)
+                        if generator.random() < density])
+
+
+def write_cells(grid, filename, comment=None):
+    """
+    Write a CellGrid, a PackedGrid or a bool array indexed [x][y] in the
+    plaintext .cells format
+    """
+    with open(filename, 'w') as f:
+        if comment is not None:
+            f.write('!{}\n'.format(comment))
+        if isinstance(grid, life.CellGrid):
+            for y in range(grid.height):
+                f.write(''.join('O' if grid[x][y] else '.'
+                                for x in range(grid.width)))
+                f.write('\n')
+            return
+
+        # other grids are unpacked a row at a time
+        import rleexport
+        width, height = rleexport.grid_size(grid)
+        for y in range(height):
+            row = rleexport.band(grid, 0, y, width, 1)[:, 0]
+            f.write(''.join('O' if alive else '.' for alive in row.tolist()))
+            f.write('\n')
+
+
+def write_grid(grid, filename, rules, generation):
+    """ Write grid as RLE if filename ends in .rle, otherwise as .cells """
+    comment = 'generation {} rule {}'.format(generation,
+                                             life.format_rules(rules))
+    if filename.casefold().endswith('.rle'):
+        import rleexport
+        rleexport.write_rle(grid, filename, rules, comment=comment)
+    else:
+        write_cells(grid, filename, comment)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description='Run a Game of Life simulation without a display')
+
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--rle', help='pattern file to start from')
+    source.add_argument('--size', type=parse_size,
+                        help='grid size as WIDTHxHEIGHT, filled randomly')
+    source.add_argument('--resume', metavar='CHECKPOINT',
+                        help='checkpoint to continue from')
+
+    parser.add_argument('--grid-size', type=parse_size,
+                        help='grid size for --rle, defaults to the pattern '
+                             'size plus --margin on every side')
+    parser.add_argument('--margin', type=int, default=32)
+    parser.add_argument('--rule', type=parse_rule_argument,
+                        help='rule string such as B3/S23, defaults to the '
+                             "pattern's rule or B3/S23")
+    parser.add_argument('--density', type=float, default=0.5,
+                        help='live cell density for --size')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--generations', type=int, required=True)
+    parser.add_argument('--engine', default='python',
+                        choices=sorted(life.ENGINES),
+                        help='the packed and parallel engines step their '
+                             'own grids without a list of every cell '
+                             'beside them')
+    parser.add_argument('--topology', choices=life.TOPOLOGIES,
+                        help="defaults to the checkpoint's topology with "
+                             '--resume and to torus otherwise')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='worker processes for the parallel engine')
+    parser.add_argument('--detect-cycles', action='store_true',
+                        help='skip ahead to the last generation once the '
+                             'grid repeats, skipped generations get no '
+                             'snapshots, torus only')
+    parser.add_argument('--cycle-table', type=int, default=4096,
+                        metavar='N',
+                        help='number of recent generations compared when '
+                             'detecting cycles')
+    parser.add_argument('--output',
+                        help='file for the final generation, RLE if it '
+                             'ends in .rle and plaintext .cells otherwise')
+    parser.add_argument('--checkpoint',
+                        help='binary checkpoint file for the final '
+                             'generation, torus only')
+    parser.add_argument('--snapshot-every', type=int, default=0,
+                        metavar='N', help='write every Nth generation')
+    parser.add_argument('--snapshot-name', default='snapshot_{:06d}.cells',
+                        help='format string for snapshot file names, '
+                             'given the generation, written like --output')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    rules = args.rule
+    topology = args.topology
+    pattern = None
+    saved = None
+    if args.resume is not None:
+        import checkpoint
+        with checkpoint.load(args.resume) as saved:
+            width, height = saved.width, saved.height
+            if rules is None:
+                rules = saved.rules
+            if topology is None:
+                topology = saved.topology
+            elif topology != saved.topology:
+                parser.error('{} was saved on a {}, not a {}'.format(
+                    args.resume, saved.topology, topology))
+    elif args.rle is not None:
+        _, pattern = life.Pattern.parsefile(args.rle)
+        if rules is None:
+            rules = pattern.rules
+        width, height = args.grid_size or (pattern.width + 2 * args.margin,
+                                           pattern.height + 2 * args.margin)
+    else:
+        width, height = args.size
+    if rules is None:
+        rules = life.Rules((3,), (2, 3))
+    if topology is None:
+        topology = 'torus'
+    if args.detect_cycles and topology == 'plane':
+        parser.error('--detect-cycles needs a torus, the cells that leave '
+                     'a plane are not hashed')
+    if args.checkpoint is not None and topology == 'plane':
+        parser.error('--checkpoint needs a torus, the cells that leave a '
+                     'plane are not saved')
+
+    try:
+        grid = stepped_grid(width, height, args.engine, topology,
+                            {'workers': args.workers})
+        if isinstance(grid, life.CellGrid):
+            grid.check_rules(rules)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        first = 0
+        if saved is not None and isinstance(grid, life.CellGrid):
+            first = checkpoint.restore(grid, args.resume).iteration
+        elif saved is not None:
+            with checkpoint.load(args.resume) as saved:
+                if args.engine == 'packed':
+                    # step the mapped words, without unpacking them
+                    grid = saved.packed()
+                else:
+                    grid.set_cells(saved.cells())
+                first = saved.iteration
+        elif pattern is not None:
+            place_pattern(grid, pattern)
+        else:
+            randomize(grid, args.density, args.seed)
+        last = first + args.generations
+
+        rule_string = life.format_rules(rules)
+
+        detector = None
+        if args.detect_cycles:
+            detector = cycles.CycleDetector(args.cycle_table)
+            detector.observe(first, current_cells(grid))
+
+        elapsed = 0.0
+        stepped = 0
+        generation = first
+        while generation < last:
+            started = time.perf_counter()
+            changed_cells = None
+            if detector is None or not isinstance(grid, life.CellGrid):
+                grid.next_generation(rules)
+            else:
+                changed_cells = grid.step(rules)
+            elapsed += time.perf_counter() - started
+            stepped += 1
+            generation += 1
+
+            if args.snapshot_every and generation % args.snapshot_every == 0:
+                write_grid(current_cells(grid),
+                           args.snapshot_name.format(generation), rules,
+                           generation)
+
+            if (detector is not None and
+                    detector.observe(generation, current_cells(grid),
+                                     changed_cells)):
+                cycle = detector.cycle
+                remaining = (last - generation) % cycle.period
+                started = time.perf_counter()
+                for _ in range(remaining):
+                    grid.next_generation(rules)
+                elapsed += time.perf_counter() - started
+                stepped += remaining
+                print('{}, skipped to generation {}'.format(cycle, last),
+                      file=sys.stderr)
+                generation = last
+
+        if args.output is not None:
+            write_grid(current_cells(grid), args.output, rules, last)
+        if args.checkpoint is not None:
+            import checkpoint
+            checkpoint.save(current_cells(grid), args.checkpoint, rules, last)
+    finally:
+        # the parallel engine keeps worker processes until closed
+        if hasattr(grid, 'close'):
+            grid.close()
+
+    rate = stepped / elapsed if elapsed > 0 else float('inf')
+    print('{} generations of {}x{} {} with the {} engine in {:.3f} s, '
+          '{:.1f} generations per second'.format(
+              stepped, width, height, rule_string, args.engine,
+              elapsed, rate), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
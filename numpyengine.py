@@ -0,0 +1,82 @@
+import numpy as np
+
+import life
+
+
+def rule_table(rules):
+    """
+    Build a 2x9 lookup table indexed by [alive][neighbour count]
+    from a Rules tuple
+    """
+    table = np.zeros((2, 9), dtype=bool)
+    for alive, ruleset in enumerate((rules.b, rules.s)):
+        for rule in ruleset:
+            if 0 <= rule <= 8:
+                table[alive][rule] = True
+    return table
+
+
+def neighbour_counts(cells):
+    """
+    Count the live Moore neighbours of every cell of an array indexed
+    [..., x, y], wrapping around the last two axes
+    """
+    cells = cells.astype(np.uint8)
+
+    columns = (cells + np.roll(cells, 1, axis=-2) +
+               np.roll(cells, -1, axis=-2))
+    block = (columns + np.roll(columns, 1, axis=-1) +
+             np.roll(columns, -1, axis=-1))
+
+    return block - cells
+
+
+def step(cells, rules, table=None):
+    """ Return the generation after cells, a 2-D bool array indexed [x][y] """
+    if table is None:
+        table = rule_table(rules)
+
+    if cells.size == 0:
+        return cells.astype(bool)
+
+    return table[cells.astype(np.uint8), neighbour_counts(cells)]
+
+
+class Engine(life.Engine):
+    """
+    Engine keeping the cells in a bool array between generations.
+
+    Only the cells that changed are written back to the grid's lists, and
+    cells set outside the engine are copied into the array one by one.
+    """
+
+    tracks_changes = True
+
+    def __init__(self, grid, **options):
+        super().__init__(grid, **options)
+        self._rules = None
+        self._table = None
+        self.reset()
+
+    def reset(self):
+        grid = self.grid
+        self.cells = np.array(grid, dtype=bool).reshape(grid.width,
+                                                         grid.height)
+
+    def cell_changed(self, x, y):
+        self.cells[x, y] = self.grid[x][y]
+
+    def next_generation(self, rules):
+        if rules != self._rules:
+            self._rules = rules
+            self._table = rule_table(rules)
+
+        cells = step(self.cells, rules, self._table)
+        xs, ys = np.nonzero(cells != self.cells)
+        self.cells = cells
+
+        changes = list(zip(xs.tolist(), ys.tolist()))
+        grid = self.grid
+        for x, y in changes:
+            grid[x][y] = not grid[x][y]
+        return changes
@@ -0,0 +1,67 @@
+"""
+Zoomed out views of a grid.
+
+When cells are too small to be drawn one by one, a region of the grid is
+split into blocks of shrink x shrink cells, and each block is drawn as
+cellsize x cellsize pixels shaded by how many of its cells are alive. The
+live cells of every block are counted once when the view is set up and
+then kept up to date from each generation's changed cells, so drawing
+costs one pass over the pixels of the view whatever the size of the grid.
+"""
+import numpy as np
+
+
+class Overview(object):
+    """ Live cell counts of the blocks of a region (x, y, width, height) """
+
+    def __init__(self, grid, x, y, width, height, shrink):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.shrink = shrink
+
+        blocks_width = -(-width // shrink)
+        blocks_height = -(-height // shrink)
+        cells = np.zeros((blocks_width * shrink, blocks_height * shrink),
+                         dtype=np.uint8)
+        cells[:width, :height] = np.array(
+            [column[y:y + height] for column in grid[x:x + width]],
+            dtype=bool).reshape(width, height)
+        self.counts = cells.reshape(
+            blocks_width, shrink, blocks_height, shrink).sum(
+                axis=(1, 3), dtype=np.int32)
+
+    def update(self, grid, changed_cells):
+        """ Count the (x, y) changed_cells of grid that are in the region """
+        if not changed_cells:
+            return
+        xs, ys = np.array(changed_cells, dtype=np.intp).T
+        inside = ((xs >= self.x) & (xs < self.x + self.width) &
+                  (ys >= self.y) & (ys < self.y + self.height))
+        xs, ys = xs[inside], ys[inside]
+        if not len(xs):
+            return
+
+        alive = np.array([grid[x][y] for x, y in zip(xs.tolist(),
+                                                     ys.tolist())])
+        np.add.at(self.counts,
+                  ((xs - self.x) // self.shrink, (ys - self.y) // self.shrink),
+                  np.where(alive, 1, -1))
+
+    def ppm(self, cellsize, background, color):
+        """
+        The blocks as binary PPM image data, cellsize pixels to a block.
+        background and color are (red, green, blue) from 0 to 255.
+        """
+        # the square root keeps sparse blocks visible
+        shade = np.sqrt(self.counts / float(self.shrink ** 2))
+        background = np.array(background, dtype=float)
+        color = np.array(color, dtype=float)
+        pixels = (background + (color - background) *
+                  shade.T[..., np.newaxis]).round().astype(np.uint8)
+        if cellsize > 1:
+            pixels = pixels.repeat(cellsize, axis=0).repeat(cellsize, axis=1)
+
+        height, width = pixels.shape[:2]
+        return b'P6 %d %d 255\n' % (width, height) + pixels.tobytes()
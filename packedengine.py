@@ -0,0 +1,214 @@
+import numpy as np
+
+import life
+
+WORD_BITS = 64
+
+_ONE = np.uint64(1)
+_TOP = np.uint64(WORD_BITS - 1)
+
+
+def _full_adder(a, b, c):
+    """ Add three bit planes, returning (sum, carry) planes """
+    partial = a ^ b
+    return partial ^ c, (a & b) | (partial & c)
+
+
+class PackedGrid(object):
+    """
+    Toroidal cell grid holding 64 cells per uint64 word.
+
+    Words are stored as rows, words[y][x // 64] holds the cell at x, y in bit
+    x % 64. Bits past the grid width are always kept clear.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.words = np.zeros((height, self.row_words), dtype=np.uint64)
+
+    @classmethod
+    def from_cells(cls, cells):
+        """ Pack a bool grid indexed [x][y] """
+        cells = np.asarray(cells, dtype=bool)
+        grid = cls(*cells.shape)
+        grid.set_cells(cells)
+        return grid
+
+    @classmethod
+    def from_words(cls, width, height, words):
+        """ Wrap a (height, row_words) uint64 array without copying it """
+        grid = cls.__new__(cls)
+        grid.width = width
+        grid.height = height
+        grid.words = words
+        return grid
+
+    @property
+    def row_words(self):
+        return -(-self.width // WORD_BITS)
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes
+
+    @property
+    def population(self):
+        return int(np.unpackbits(self._bytes()).sum())
+
+    def set_cells(self, cells):
+        cells = np.asarray(cells, dtype=bool).reshape(self.width, self.height)
+        packed = np.zeros((self.height, self.row_words * 8), dtype=np.uint8)
+        row_bytes = np.packbits(cells.T, axis=1, bitorder='little')
+        packed[:, :row_bytes.shape[1]] = row_bytes
+        self.words = packed.view('<u8').astype(np.uint64)
+
+    def to_cells(self):
+        """ Unpack into a bool array indexed [x][y] """
+        bits = np.unpackbits(self._bytes(), axis=1, bitorder='little')
+        return bits[:, :self.width].T.astype(bool)
+
+    def live_cells(self):
+        """ (xs, ys) arrays of the live cells, only unpacking nonzero words """
+        ys, words = np.nonzero(self.words)
+        bits = np.unpackbits(
+            self.words[ys, words].astype('<u8').view(np.uint8).reshape(-1, 8),
+            axis=1, bitorder='little')
+        found, bit = np.nonzero(bits)
+        return words[found] * WORD_BITS + bit, ys[found]
+
+    def set_live_cells(self, xs, ys):
+        """ Set the cells at the xs, ys arrays alive, wrapping like [x, y] """
+        if not len(xs):
+            return
+        xs = np.asarray(xs, dtype=np.int64) % self.width
+        ys = np.asarray(ys, dtype=np.int64) % self.height
+        words, bits = np.divmod(xs, WORD_BITS)
+        np.bitwise_or.at(self.words, (ys, words),
+                         _ONE << bits.astype(np.uint64))
+
+    def __getitem__(self, position):
+        x, y = position
+        word, bit = divmod(x % self.width, WORD_BITS)
+        return bool((self.words[y % self.height, word] >> np.uint64(bit))
+                    & _ONE)
+
+    def __setitem__(self, position, state):
+        x, y = position
+        word, bit = divmod(x % self.width, WORD_BITS)
+        mask = _ONE << np.uint64(bit)
+        if state:
+            self.words[y % self.height, word] |= mask
+        else:
+            self.words[y % self.height, word] &= ~mask
+
+    def next_generation(self, rules):
+        if self.width == 0 or self.height == 0:
+            return
+
+        alive = self.words
+        west = self._shift_west(alive)
+        east = self._shift_east(alive)
+
+        # sum of each row's three horizontal cells, and of its two outer cells
+        row0, row1 = _full_adder(west, alive, east)
+        side0, side1 = west ^ east, west & east
+
+        up0, up1 = np.roll(row0, 1, axis=0), np.roll(row1, 1, axis=0)
+        down0, down1 = np.roll(row0, -1, axis=0), np.roll(row1, -1, axis=0)
+
+        count0, carry = _full_adder(up0, down0, side0)
+        twos, fours = _full_adder(up1, down1, side1)
+        count1 = twos ^ carry
+        fours_carry = twos & carry
+        count2 = fours ^ fours_carry
+        count3 = fours & fours_carry
+
+        counts = (count0, count1, count2, count3)
+
+        if tuple(sorted(set(rules.b))) == (3,) and \
+                tuple(sorted(set(rules.s))) == (2, 3):
+            new = count1 & ~count2 & ~count3 & (count0 | alive)
+        else:
+            new = np.zeros_like(alive)
+            for ruleset, state in ((rules.b, ~alive), (rules.s, alive)):
+                for rule in set(ruleset):
+                    if 0 <= rule <= 8:
+                        new |= state & self._count_equals(counts, rule)
+
+        self.words = new & self._row_mask()
+
+    def _bytes(self):
+        return self.words.astype('<u8').view(np.uint8)
+
+    def _row_mask(self):
+        mask = np.full(self.row_words, ~np.uint64(0), dtype=np.uint64)
+        spare = self.row_words * WORD_BITS - self.width
+        if spare:
+            mask[-1] >>= np.uint64(spare)
+        return mask
+
+    def _last_bit(self):
+        return divmod(self.width - 1, WORD_BITS)
+
+    def _shift_west(self, words):
+        """ Planes where each cell holds its west (x - 1) neighbour """
+        shifted = words << _ONE
+        shifted[:, 1:] |= words[:, :-1] >> _TOP
+
+        word, bit = self._last_bit()
+        shifted[:, 0] |= (words[:, word] >> np.uint64(bit)) & _ONE
+        return shifted & self._row_mask()
+
+    def _shift_east(self, words):
+        """ Planes where each cell holds its east (x + 1) neighbour """
+        shifted = words >> _ONE
+        shifted[:, :-1] |= words[:, 1:] << _TOP
+
+        word, bit = self._last_bit()
+        shifted[:, word] |= (words[:, 0] & _ONE) << np.uint64(bit)
+        return shifted
+
+    @staticmethod
+    def _count_equals(counts, number):
+        result = None
+        for i, plane in enumerate(counts):
+            plane = plane if number >> i & 1 else ~plane
+            result = plane if result is None else result & plane
+        return result
+
+
+class Engine(life.Engine):
+    """
+    Engine keeping the cells in a PackedGrid between generations.
+
+    The changed cells are found from the XOR of the words before and after
+    a step, and only those are written back to the grid's lists.
+    """
+
+    tracks_changes = True
+
+    def __init__(self, grid, **options):
+        super().__init__(grid, **options)
+        self.reset()
+
+    def reset(self):
+        grid = self.grid
+        self.packed = PackedGrid.from_cells(
+            np.array(grid, dtype=bool).reshape(grid.width, grid.height))
+
+    def cell_changed(self, x, y):
+        self.packed[x, y] = self.grid[x][y]
+
+    def next_generation(self, rules):
+        packed = self.packed
+        words = packed.words
+        packed.next_generation(rules)
+
+        xs, ys = PackedGrid.from_words(packed.width, packed.height,
+                                       words ^ packed.words).live_cells()
+        changes = list(zip(xs.tolist(), ys.tolist()))
+        grid = self.grid
+        for x, y in changes:
+            grid[x][y] = not grid[x][y]
+        return changes
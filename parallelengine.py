@@ -0,0 +1,184 @@
+import os
+from multiprocessing import Pipe, Process
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+import life
+import numpyengine
+
+
+def _strip_worker(buffers, width, height, ystart, yend, connection):
+    """
+    Step rows ystart to yend of the shared grid on every request, reading
+    one halo row on each side straight from the source buffer
+    """
+    grids = [np.ndarray((width, height), dtype=np.uint8, buffer=buffer.buf)
+             for buffer in buffers]
+    rows = np.arange(ystart - 1, yend + 1) % height
+
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        source, table = request
+
+        strip = numpyengine.step(grids[source][:, rows], None, table)
+        grids[source ^ 1][:, ystart:yend] = strip[:, 1:-1]
+        connection.send(True)
+
+    del grids
+    connection.close()
+
+
+class ParallelStepper(object):
+    """
+    Toroidal grid stepped by a pool of worker processes, one horizontal
+    strip each.
+
+    The grid is double buffered in shared memory so workers read their halo
+    rows in place and only the rule table is sent each generation.
+    """
+
+    def __init__(self, width, height, workers=0):
+        self.width = width
+        self.height = height
+
+        if not workers:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, height))
+
+        size = max(1, width * height)
+        self._buffers = [SharedMemory(create=True, size=size)
+                         for _ in range(2)]
+        self._current = 0
+
+        self._connections = []
+        self._processes = []
+        bounds = np.linspace(0, height, workers + 1).astype(int)
+        for ystart, yend in zip(bounds[:-1], bounds[1:]):
+            if ystart == yend:
+                continue
+            connection, worker_connection = Pipe()
+            process = Process(target=_strip_worker,
+                              args=(self._buffers, width, height,
+                                    ystart, yend, worker_connection),
+                              daemon=True)
+            process.start()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    @property
+    def workers(self):
+        return len(self._processes)
+
+    @property
+    def cells(self):
+        """ The current generation as a uint8 array indexed [x][y] """
+        return self._array(self._current)
+
+    @property
+    def previous(self):
+        """ The generation before cells, in the other buffer """
+        return self._array(self._current ^ 1)
+
+    def set_cells(self, cells):
+        """ Copy in a bool grid indexed [x][y] """
+        self.cells[:] = cells
+
+    def set_live_cells(self, xs, ys):
+        """ Set the cells at the xs, ys arrays alive, wrapping at the edges """
+        if len(xs):
+            self.cells[np.asarray(xs) % self.width,
+                       np.asarray(ys) % self.height] = 1
+
+    def _array(self, index):
+        return np.ndarray((self.width, self.height), dtype=np.uint8,
+                          buffer=self._buffers[index].buf)
+
+    def next_generation(self, rules):
+        if self.width == 0 or self.height == 0:
+            return
+
+        table = numpyengine.rule_table(rules)
+        for connection in self._connections:
+            connection.send((self._current, table))
+        for connection in self._connections:
+            connection.recv()
+
+        self._current ^= 1
+
+    def close(self):
+        for connection in self._connections:
+            connection.send(None)
+            connection.close()
+        for process in self._processes:
+            process.join()
+        for buffer in self._buffers:
+            buffer.close()
+            buffer.unlink()
+
+        self._connections = []
+        self._processes = []
+        self._buffers = []
+
+
+class Engine(life.Engine):
+    """
+    Engine keeping the cells in a ParallelStepper's shared buffers.
+
+    The stepper is started on the first generation and after the grid
+    changes size. Only the columns with cells that differ between its two
+    buffers are written back to the grid's lists, each replaced whole.
+    close() stops the workers and frees the shared memory.
+    """
+
+    tracks_changes = True
+
+    def __init__(self, grid, workers=0, **options):
+        super().__init__(grid, **options)
+        self.workers = workers
+        self._stepper = None
+        self._synced = False
+
+    def reset(self):
+        stepper = self._stepper
+        if stepper is not None and (stepper.width != self.grid.width or
+                                    stepper.height != self.grid.height):
+            self.close()
+        self._synced = False
+
+    def cell_changed(self, x, y):
+        if self._synced:
+            self._stepper.cells[x, y] = self.grid[x][y]
+
+    def next_generation(self, rules):
+        grid = self.grid
+        if grid.width == 0 or grid.height == 0:
+            return []
+
+        if self._stepper is None:
+            self._stepper = ParallelStepper(grid.width, grid.height,
+                                            self.workers)
+        stepper = self._stepper
+        if not self._synced:
+            stepper.cells[:] = np.array(grid, dtype=bool).reshape(
+                grid.width, grid.height)
+            self._synced = True
+
+        stepper.next_generation(rules)
+        current = stepper.cells
+        changed = current != stepper.previous
+        columns = np.flatnonzero(changed.any(axis=1))
+        for x, column in zip(columns.tolist(),
+                             current[columns].astype(bool).tolist()):
+            grid[x] = column
+
+        xs, ys = np.nonzero(changed)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def close(self):
+        if self._stepper is not None:
+            self._stepper.close()
+            self._stepper = None
+        self._synced = False
@@ -0,0 +1,189 @@
+"""
+On-disk cache of parsed RLE patterns.
+
+The cache file starts with an index of every pattern: its source path,
+modification time and size, name, dimensions and rules. The run data of
+each pattern follows the index and is only read when the pattern is first
+used.
+"""
+from array import array
+import os
+import struct
+import sys
+
+import life
+
+MAGIC = b'GOLPATC1'
+
+_COUNT = struct.Struct('<I')
+# path length, name length, mtime in ns, file size, width, height,
+# birth mask, survival mask, run data offset, run count
+_ENTRY = struct.Struct('<HHqQIIHHQI')
+
+
+class CachedPattern(object):
+    """
+    Name, size and rules of a pattern file, with the Pattern itself parsed
+    or read from the cache on the first call to pattern()
+    """
+
+    def __init__(self, cache, path, mtime, size, name, width, height, rules,
+                 offset=None, run_count=0, pattern=None):
+        self.cache = cache
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.name = name
+        self.width = width
+        self.height = height
+        self.rules = rules
+        self.offset = offset
+        self.run_count = run_count
+        self._pattern = pattern
+
+    @property
+    def loaded(self):
+        return self._pattern is not None
+
+    def pattern(self):
+        if self._pattern is None:
+            try:
+                self._pattern = self.cache.read_pattern(self)
+            except (OSError, ValueError):
+                _, self._pattern = life.Pattern.parsefile(self.path)
+        return self._pattern
+
+    def run_data(self):
+        """ Run lengths and states encoded as stored in the cache file """
+        if self._pattern is None:
+            return self.cache.read_run_data(self)
+
+        runs = self._pattern.commands
+        if not isinstance(runs, life.RunList):
+            lengths = array('I', (length for length, _ in runs))
+            states = ''.join(state for _, state in runs)
+        else:
+            lengths = array('I', runs.lengths)
+            states = runs.states
+        if sys.byteorder == 'big':
+            lengths.byteswap()
+        return lengths.tobytes() + states.encode('latin-1', 'replace')
+
+
+class PatternCache(object):
+    """
+    Patterns keyed by path, modification time and size. With a filename of
+    None nothing is read or written and every pattern is parsed.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._cached = {}
+        self._used = {}
+        self._dirty = False
+
+        if filename is not None:
+            try:
+                self._read_index()
+            except (OSError, ValueError, struct.error, UnicodeDecodeError):
+                self._cached = {}
+
+    def load(self, filename):
+        """ CachedPattern for an RLE file, parsing it if it changed """
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+
+        entry = self._cached.get(path)
+        if (entry is None or entry.mtime != stat.st_mtime_ns or
+                entry.size != stat.st_size):
+            name, pattern = life.Pattern.parsefile(path)
+            entry = CachedPattern(self, path, stat.st_mtime_ns, stat.st_size,
+                                  name, pattern.width, pattern.height,
+                                  pattern.rules, pattern=pattern)
+            self._cached[path] = entry
+            self._dirty = True
+
+        self._used[path] = entry
+        return entry
+
+    def save(self):
+        """
+        Write every pattern loaded since the cache was opened, if any of
+        them changed
+        """
+        if self.filename is None:
+            return
+        if not self._dirty and self._used.keys() == self._cached.keys():
+            return
+
+        entries = list(self._used.values())
+        blobs = [entry.run_data() for entry in entries]
+        encoded = [(entry.path.encode('utf-8'), entry.name.encode('utf-8'))
+                   for entry in entries]
+
+        offset = len(MAGIC) + _COUNT.size + sum(
+            _ENTRY.size + len(path) + len(name) for path, name in encoded)
+        offsets = []
+        for blob in blobs:
+            offsets.append(offset)
+            offset += len(blob)
+
+        temporary = self.filename + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_COUNT.pack(len(entries)))
+            for entry, (path, name), offset, blob in zip(entries, encoded,
+                                                         offsets, blobs):
+                f.write(_ENTRY.pack(
+                    len(path), len(name), entry.mtime, entry.size,
+                    entry.width, entry.height, *life.rule_masks(entry.rules),
+                    offset, len(blob) // 5))
+                f.write(path)
+                f.write(name)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(temporary, self.filename)
+
+        for entry, offset, blob in zip(entries, offsets, blobs):
+            entry.offset = offset
+            entry.run_count = len(blob) // 5
+        self._cached = dict(self._used)
+        self._dirty = False
+
+    def read_run_data(self, entry):
+        if entry.offset is None:
+            raise ValueError('{} is not in the cache'.format(entry.path))
+        with open(self.filename, 'rb') as f:
+            f.seek(entry.offset)
+            data = f.read(entry.run_count * 5)
+        if len(data) != entry.run_count * 5:
+            raise ValueError('truncated pattern cache')
+        return data
+
+    def read_pattern(self, entry):
+        data = self.read_run_data(entry)
+        split = entry.run_count * 4
+
+        lengths = array('I')
+        lengths.frombytes(data[:split])
+        if sys.byteorder == 'big':
+            lengths.byteswap()
+        runs = life.RunList.from_runs(lengths, data[split:].decode('latin-1'))
+
+        return life.Pattern(entry.width, entry.height, entry.rules, runs)
+
+    def _read_index(self):
+        with open(self.filename, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError('not a pattern cache')
+            count, = _COUNT.unpack(f.read(_COUNT.size))
+            for _ in range(count):
+                (path_length, name_length, mtime, size, width, height,
+                 birth, survival, offset, run_count) = _ENTRY.unpack(
+                    f.read(_ENTRY.size))
+                path = f.read(path_length).decode('utf-8')
+                name = f.read(name_length).decode('utf-8')
+                self._cached[path] = CachedPattern(
+                    self, path, mtime, size, name, width, height,
+                    life.masks_rules(birth, survival),
+                    offset, run_count)
@@ -0,0 +1,208 @@
+"""
+Write grids as RLE patterns that Pattern.parsefile can read back.
+
+Grids can be CellGrids or other lists of columns, bool arrays indexed
+[x][y] or packedengine.PackedGrids. They are converted to arrays a band of
+rows at a time and written as they are encoded, so the whole pattern is
+never held in memory as a string.
+"""
+import bisect
+
+import numpy as np
+
+import life
+
+LINE_LENGTH = 70
+BAND_CELLS = 1 << 22
+
+
+def _packed_words(grid):
+    return getattr(grid, 'words', None)
+
+
+def grid_size(grid):
+    """ (width, height) of a grid """
+    if isinstance(grid, np.ndarray):
+        return grid.shape
+    if _packed_words(grid) is not None:
+        return grid.width, grid.height
+    return len(grid), len(grid[0]) if len(grid) else 0
+
+
+def band(grid, x, y, width, height):
+    """ Bool array indexed [x][y] of a region of grid """
+    words = _packed_words(grid)
+    if words is not None:
+        rows = np.ascontiguousarray(words[y:y + height], dtype='<u8')
+        bits = np.unpackbits(rows.view(np.uint8), axis=1, bitorder='little')
+        return bits[:, x:x + width].T.astype(bool)
+    if isinstance(grid, np.ndarray):
+        return grid[x:x + width, y:y + height].astype(bool, copy=False)
+    return np.array([column[y:y + height]
+                     for column in grid[x:x + width]],
+                    dtype=bool).reshape(width, height)
+
+
+def _band_rows(width, height):
+    return max(1, min(height, BAND_CELLS // max(width, 1)))
+
+
+def bounding_box(grid):
+    """ (x, y, width, height) of the live cells, None if there are none """
+    width, height = grid_size(grid)
+    words = _packed_words(grid)
+
+    if words is not None:
+        live_rows = np.flatnonzero(words.any(axis=1))
+        if not len(live_rows):
+            return None
+        columns = np.bitwise_or.reduce(words, axis=0)
+        live_columns = np.flatnonzero(np.unpackbits(
+            np.ascontiguousarray(columns, dtype='<u8').view(np.uint8),
+            bitorder='little'))
+    else:
+        # any() over a band of rows at a time keeps the memory bounded
+        rows_any = np.zeros(height, dtype=bool)
+        columns_any = np.zeros(width, dtype=bool)
+        step = _band_rows(width, height)
+        for y in range(0, height, step):
+            cells = band(grid, 0, y, width, min(step, height - y))
+            rows_any[y:y + cells.shape[1]] = cells.any(axis=0)
+            columns_any |= cells.any(axis=1)
+        live_rows = np.flatnonzero(rows_any)
+        if not len(live_rows):
+            return None
+        live_columns = np.flatnonzero(columns_any)
+
+    x, y = int(live_columns[0]), int(live_rows[0])
+    return (x, y, int(live_columns[-1]) - x + 1, int(live_rows[-1]) - y + 1)
+
+
+def row_runs(cells):
+    """
+    Runs of every row of a bool array indexed [x][y], as (row, length,
+    alive) arrays ordered by row then x
+    """
+    rows = np.ascontiguousarray(cells.T)
+    height, width = rows.shape
+
+    # every row starts a run, so no run crosses into the next row
+    starts = np.ones_like(rows)
+    starts[:, 1:] = rows[:, 1:] != rows[:, :-1]
+    positions = np.flatnonzero(starts)
+
+    lengths = np.diff(np.append(positions, rows.size))
+    return positions // width, lengths, rows.reshape(-1)[positions]
+
+
+_POWERS_OF_TEN = 10 ** np.arange(19, dtype=np.int64)
+
+
+def _digit_counts(numbers, smallest):
+    """ Decimal digits of numbers, 0 for numbers below smallest """
+    counts = (numbers >= smallest).astype(np.int64)
+    for power in _POWERS_OF_TEN[1:]:
+        if not (numbers >= power).any():
+            break
+        counts += numbers >= power
+    return counts
+
+
+def _put_numbers(buffer, offsets, numbers, digit_counts):
+    """ Write numbers as ASCII decimals into buffer at offsets """
+    for digit in range(int(digit_counts.max(initial=0))):
+        has_digit = digit_counts > digit
+        place = _POWERS_OF_TEN[digit_counts[has_digit] - 1 - digit]
+        buffer[offsets[has_digit] + digit] = (
+            ord('0') + numbers[has_digit] // place % 10)
+
+
+def encode_band(cells, open_rows=0):
+    """
+    RLE of a bool array indexed [x][y] as (text, token ends, open rows).
+    Lines may only be broken at the token ends. open_rows are the rows
+    left unended by the band above, and the returned open rows those left
+    unended by this one.
+    """
+    rows, lengths, alive = row_runs(cells)
+
+    # a row's trailing dead cells are left out
+    last = np.ones(len(rows), dtype=bool)
+    last[:-1] = rows[1:] != rows[:-1]
+    keep = alive | ~last
+    rows, lengths, alive = rows[keep], lengths[keep], alive[keep]
+    if not len(rows):
+        return '', np.zeros(0, dtype=np.int64), open_rows + cells.shape[1]
+
+    # each token is the rows ended before it as "$" or "n$", then the run
+    # length unless it is 1, then the state
+    ended = np.diff(rows, prepend=rows[0])
+    ended[0] = open_rows + rows[0]
+    ended_digits = _digit_counts(ended, 2)
+    has_end = ended > 0
+    length_digits = _digit_counts(lengths, 2)
+
+    token_lengths = ended_digits + has_end + length_digits + 1
+    ends = np.cumsum(token_lengths)
+    starts = ends - token_lengths
+
+    buffer = np.empty(int(ends[-1]), dtype=np.uint8)
+    _put_numbers(buffer, starts, ended, ended_digits)
+    buffer[(starts + ended_digits)[has_end]] = ord('$')
+    _put_numbers(buffer, starts + ended_digits + has_end, lengths,
+                 length_digits)
+    buffer[ends - 1] = np.where(alive, ord('o'), ord('b'))
+
+    return (buffer.tobytes().decode('ascii'), ends,
+            cells.shape[1] - int(rows[-1]))
+
+
+def encode(grid, region):
+    """ Yield (text, token ends) of a region of grid a band at a time """
+    x, y, width, height = region
+    open_rows = 0
+    step = _band_rows(width, height)
+
+    for band_y in range(y, y + height, step):
+        cells = band(grid, x, band_y, width, min(step, y + height - band_y))
+        text, ends, open_rows = encode_band(cells, open_rows)
+        if text:
+            yield text, ends
+
+
+def write_rle(grid, filename, rules, region=None, name=None, comment=None):
+    """
+    Write a region (x, y, width, height) of grid as RLE, by default the
+    bounding box of its live cells. Returns the region written.
+    """
+    if region is None:
+        region = bounding_box(grid) or (0, 0, 0, 0)
+
+    with open(filename, 'w') as f:
+        if name is not None:
+            f.write('#N {}\n'.format(name))
+        if comment is not None:
+            f.write('#C {}\n'.format(comment))
+        f.write('x = {}, y = {}, rule = {}\n'.format(
+            region[2], region[3], life.format_rules(rules)))
+
+        first = True
+        for text, ends in encode(grid, region):
+            if not first:
+                f.write('\n')
+            first = False
+
+            # each line takes as many tokens as fit in LINE_LENGTH, or one
+            # token if it is longer
+            ends = ends.tolist()
+            lines = []
+            position = 0
+            while position < len(text):
+                fits = bisect.bisect_right(ends, position + LINE_LENGTH)
+                end = ends[fits - 1] if fits and ends[fits - 1] > position \
+                    else ends[fits]
+                lines.append(text[position:end])
+                position = end
+            f.write('\n'.join(lines))
+        f.write('!\n')
+    return region
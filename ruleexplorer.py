@@ -0,0 +1,230 @@
+"""
+Screen many B/S rules for interesting behaviour.
+
+    python ruleexplorer.py --rules-file cool_rules.txt --seeds 4
+    python ruleexplorer.py --random 2000 --table ranked.tsv \\
+        --write-rules interesting.txt --top 20
+
+Every (rule, seed) pair is an independent random soup stepped with the
+numpy engine in a pool of worker processes. Rules are ranked by the
+fraction of cells changing per generation late in the run, peaking at about
+one in nine since much more is noise, and weighted towards populations that
+neither died out nor filled the grid. Still lifes and period 2 oscillators
+score 0.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import random
+import statistics
+import sys
+
+import numpy as np
+
+import cycles
+import life
+import numpyengine
+
+
+def random_rules(count, seed=None):
+    """ count distinct random Rules """
+    generator = random.Random(seed)
+    found = set()
+    while len(found) < min(count, 2 ** 18):
+        birth = tuple(n for n in range(9) if generator.random() < 0.5)
+        survival = tuple(n for n in range(9) if generator.random() < 0.5)
+        found.add(life.Rules(birth, survival))
+    return sorted(found)
+
+
+def run_soup(job):
+    """
+    Step one random soup and return its statistics.
+
+    job is (name, rules, seed, size, generations, density, cycle_table).
+    """
+    name, rules, seed, size, generations, density, cycle_table = job
+
+    cells = np.random.default_rng(seed).random((size, size)) < density
+    table = numpyengine.rule_table(rules)
+    detector = cycles.CycleDetector(cycle_table)
+    detector.observe(0, cells)
+
+    population = [int(np.count_nonzero(cells))]
+    activity = []
+    for generation in range(1, generations + 1):
+        next_cells = numpyengine.step(cells, rules, table)
+        changed = np.nonzero(next_cells ^ cells)
+        cells = next_cells
+
+        population.append(int(np.count_nonzero(cells)))
+        activity.append(len(changed[0]) / cells.size)
+        if detector.observe(generation, cells, zip(*changed)):
+            break
+
+    cycle = detector.cycle
+    late = activity[len(activity) // 2:] or [0.0]
+    late_activity = statistics.mean(late)
+    final_density = population[-1] / cells.size
+
+    if cycle is not None and cycle.period <= 2:
+        score = 0.0
+    else:
+        score = (late_activity * (1 - late_activity) ** 8 *
+                 4 * final_density * (1 - final_density))
+
+    return {
+        'name': name,
+        'rule': life.format_rules(rules),
+        'seed': seed,
+        'generations': len(activity),
+        'final_density': final_density,
+        'late_activity': late_activity,
+        'extinct': population[-1] == 0,
+        'cycle_start': None if cycle is None else cycle.start,
+        'cycle_period': None if cycle is None else cycle.period,
+        'score': score,
+        'population': population,
+    }
+
+
+def rank(runs):
+    """ One summary per rule, best mean score first """
+    by_rule = {}
+    for run in runs:
+        by_rule.setdefault(run['rule'], []).append(run)
+
+    summaries = []
+    for rule, rule_runs in by_rule.items():
+        periods = [run['cycle_period'] for run in rule_runs
+                   if run['cycle_period'] is not None]
+        summaries.append({
+            'name': rule_runs[0]['name'],
+            'rule': rule,
+            'score': statistics.mean(run['score'] for run in rule_runs),
+            'late_activity': statistics.mean(run['late_activity']
+                                             for run in rule_runs),
+            'final_density': statistics.mean(run['final_density']
+                                             for run in rule_runs),
+            'extinct': sum(run['extinct'] for run in rule_runs),
+            'cycles': len(periods),
+            'max_period': max(periods, default=None),
+            'runs': len(rule_runs),
+        })
+    summaries.sort(key=lambda summary: (-summary['score'], summary['rule']))
+    return summaries
+
+
+TABLE_COLUMNS = ('rank', 'rule', 'name', 'score', 'late_activity',
+                 'final_density', 'extinct', 'cycles', 'max_period', 'runs')
+
+
+def table_rows(summaries):
+    for position, summary in enumerate(summaries, 1):
+        row = dict(summary, rank=position)
+        for column in ('score', 'late_activity', 'final_density'):
+            row[column] = '{:.4f}'.format(row[column])
+        if row['max_period'] is None:
+            row['max_period'] = '-'
+        yield row
+
+
+def write_table(summaries, f):
+    writer = csv.DictWriter(f, TABLE_COLUMNS, delimiter='\t',
+                            extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(table_rows(summaries))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+
+    source = parser.add_argument_group('rules to screen')
+    source.add_argument('--rules-file', action='append', default=[],
+                        help='rule list in the cool_rules.txt format')
+    source.add_argument('--rules', nargs='+', default=[],
+                        help='rule strings such as B36/S23')
+    source.add_argument('--random', type=int, default=0, metavar='N',
+                        help='screen N random rules')
+
+    parser.add_argument('--seeds', type=int, default=3,
+                        help='random soups per rule')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='first soup seed and the random rule seed')
+    parser.add_argument('--size', type=int, default=128)
+    parser.add_argument('--density', type=float, default=0.35)
+    parser.add_argument('--generations', type=int, default=500)
+    parser.add_argument('--cycle-table', type=int, default=1024, metavar='N',
+                        help='recent generations compared for cycles')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='worker processes, 0 for one per CPU')
+    parser.add_argument('--table', help='file for the ranked table, '
+                                        'printed if not given')
+    parser.add_argument('--json', help='file for every run with its '
+                                       'population curve')
+    parser.add_argument('--write-rules', metavar='FILE',
+                        help='write the best rules in the cool_rules.txt '
+                             'format')
+    parser.add_argument('--top', type=int, default=10,
+                        help='number of rules for --write-rules')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    named_rules = []
+    for filename in args.rules_file:
+        named_rules.extend(life.read_rule_list(filename))
+    for rule_string in args.rules:
+        rules = life.parse_rules(rule_string)
+        named_rules.append((life.format_rules(rules), rules))
+    for rules in random_rules(args.random, args.seed):
+        named_rules.append((life.format_rules(rules), rules))
+
+    # the same rule listed twice is only screened once
+    unique = {}
+    for name, rules in named_rules:
+        unique.setdefault(life.format_rules(rules), (name, rules))
+    if not unique:
+        build_parser().error('no rules given')
+
+    jobs = [(name, rules, args.seed + offset, args.size, args.generations,
+             args.density, args.cycle_table)
+            for name, rules in unique.values()
+            for offset in range(args.seeds)]
+
+    progress = sys.stderr.isatty()
+    with multiprocessing.Pool(args.workers or None) as pool:
+        runs = []
+        for run in pool.imap_unordered(run_soup, jobs, chunksize=4):
+            runs.append(run)
+            if progress:
+                print('\r{}/{} runs'.format(len(runs), len(jobs)), end='',
+                      file=sys.stderr)
+        if progress:
+            print(file=sys.stderr)
+
+    summaries = rank(runs)
+
+    if args.table is not None:
+        with open(args.table, 'w', newline='') as f:
+            write_table(summaries, f)
+    else:
+        write_table(summaries, sys.stdout)
+
+    if args.json is not None:
+        runs.sort(key=lambda run: (run['rule'], run['seed']))
+        with open(args.json, 'w') as f:
+            json.dump({'runs': runs, 'ranking': summaries}, f, indent=2)
+
+    if args.write_rules is not None:
+        life.write_rule_list(
+            args.write_rules,
+            [(summary['name'], life.parse_rules(summary['rule']))
+             for summary in summaries[:args.top]])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import queue
+import threading
+import time
+
+
+class RateMeter(object):
+    """ Events per second, averaged over windows of about a second """
+
+    def __init__(self, window=1.0):
+        self.window = window
+        self.rate = 0.0
+        self._count = 0
+        self._start = time.monotonic()
+
+    def tick(self):
+        self._count += 1
+        now = time.monotonic()
+        if now - self._start >= self.window:
+            self.rate = self._count / (now - self._start)
+            self._count = 0
+            self._start = now
+
+
+class SimulationWorker(object):
+    """
+    Steps a CellGrid on a background thread.
+
+    Finished generations are put into a bounded queue of (iteration, cells)
+    frames, dropping the oldest frame when the reader falls behind. Cell
+    edits are queued and applied between generations. rate is the minimum
+    number of milliseconds per generation, 0 runs as fast as possible.
+    cycles is an optional CycleDetector that observes every generation the
+    worker runs, including those the reader never sees.
+    """
+
+    def __init__(self, grid, rules, rate=0, queue_size=2, cycles=None):
+        self.grid = grid
+        self.rules = rules
+        self.rate = rate
+        self.iteration = 0
+        self.sim_rate = RateMeter()
+        self.cycles = cycles
+        self.cycle_rules = None
+
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._edits = queue.Queue()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def isrunning(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.isrunning:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.isrunning:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+    def reset(self, grid):
+        """ Stop and continue from a new, cleared grid, closing the old one """
+        self.stop()
+        if grid is not self.grid:
+            self.grid.close()
+        self.grid = grid
+        self.iteration = 0
+        if self.cycles is not None:
+            self.cycles.invalidate()
+        for pending in (self._frames, self._edits):
+            while not pending.empty():
+                pending.get_nowait()
+
+    def close(self):
+        """ Stop and close the grid """
+        self.stop()
+        self.grid.close()
+
+    def set_cell(self, x, y, state):
+        if self.cycles is not None:
+            self.cycles.invalidate()
+        self._edits.put((x, y, state))
+
+    def detected_cycle(self, rules):
+        """ The Cycle found under rules since the last edit, or None """
+        if (self.cycles is None or not self.cycles.valid or
+                rules != self.cycle_rules):
+            return None
+        return self.cycles.cycle
+
+    def latest_frame(self):
+        """ Newest finished (iteration, cells) frame, or None """
+        frame = None
+        while True:
+            try:
+                frame = self._frames.get_nowait()
+            except queue.Empty:
+                return frame
+
+    def _run(self):
+        while not self._stopping.is_set():
+            started = time.monotonic()
+
+            self._apply_edits()
+            self._next_generation(self.rules)
+            self.sim_rate.tick()
+            self._publish()
+
+            remaining = self.rate / 1000 - (time.monotonic() - started)
+            if remaining > 0:
+                self._stopping.wait(remaining)
+
+        self._apply_edits()
+        self._publish()
+
+    def _next_generation(self, rules):
+        if self.cycles is None:
+            self.grid.next_generation(rules)
+            self.iteration += 1
+            return
+
+        if rules != self.cycle_rules:
+            self.cycle_rules = rules
+            self.cycles.invalidate()
+        if not self.cycles.valid:
+            self.cycles.observe(self.iteration, self.grid)
+        changed_cells = self.grid.step(rules)
+        self.iteration += 1
+        self.cycles.observe(self.iteration, self.grid, changed_cells)
+
+    def _apply_edits(self):
+        while True:
+            try:
+                x, y, state = self._edits.get_nowait()
+            except queue.Empty:
+                return
+            if x < self.grid.width and y < self.grid.height:
+                self.grid.set_cell(x, y, state)
+                if self.cycles is not None:
+                    self.cycles.invalidate()
+
+    def _publish(self):
+        frame = (self.iteration, self.grid.copy_grid())
+        while True:
+            try:
+                self._frames.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self._frames.get_nowait()
+                except queue.Empty:
+                    pass
@@ -0,0 +1,486 @@
+"""
+Search random soups and take a census of the objects they leave.
+
+    python soupsearch.py --soups 10000 --census census.json
+    python soupsearch.py --rules-file cool_rules.txt --soups 500 \\
+        --census cool_census.json
+
+Every soup is a seeded random square in the middle of an empty torus,
+stepped with batchengine in a pool of worker processes until the whole
+universe repeats. Live cells closer than three cells are clustered, and
+every cluster is split into its 8-connected parts unless one of those
+does not repeat on its own. Each object is run alone to find its period
+and whether it moves. It is canonicalised under the 8 orientations a
+Selection can take and over all of its phases, then hashed. The census
+counts objects by a name like apgsearch's: xs<cells> for still lifes,
+xp<period> for oscillators, xq<period> for spaceships and zz for objects
+that do not repeat within MAX_PERIOD generations, followed by the hash.
+
+The census file is rewritten after every batch, running the same command
+again continues where it stopped. Gliders that escape wrap around the
+torus and may hit other objects, so the counts differ a little from
+searches on an unbounded plane.
+
+B0 rules turn the empty background live. Without S8 it strobes, so the
+cells are complemented in odd generations and stepped with a rule for
+even and one for odd generations, keeping the background empty. Objects
+are found and compared in even generations only, so their periods are
+even and a still life is anything that comes back every two generations.
+With S8 the background stays live and the soups are searched as dead
+cells on it, with the complemented rule.
+"""
+from collections import OrderedDict
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+import batchengine
+import life
+import numpyengine
+import rleexport
+
+# longest period an object is run for on its own
+MAX_PERIOD = 64
+
+# objects whose classification is kept, the least recently seen go first
+CLASSIFIED_LIMIT = 4096
+
+NEIGHBOURS = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                   if dx or dy)
+CLUSTER_OFFSETS = tuple((dx, dy) for dx in range(-2, 3)
+                        for dy in range(-2, 3) if dx or dy)
+
+# every orientation Selection reaches with flips and rotations
+ORIENTATIONS = tuple((xflipped, yflipped, rotation)
+                     for xflipped in (False, True)
+                     for yflipped in (False, True)
+                     for rotation in range(4))
+
+
+def soups(seed, first, count, size, soup_size, density):
+    """
+    Bool array indexed [soup][x][y] of count soups from number first on,
+    each a soup_size square in the middle of an empty size x size torus
+    """
+    cells = np.zeros((count, size, size), dtype=bool)
+    start = (size - soup_size) // 2
+    for index in range(count):
+        generator = np.random.default_rng([seed, first + index])
+        cells[index, start:start + soup_size, start:start + soup_size] = (
+            generator.random((soup_size, soup_size)) < density)
+    return cells
+
+
+def emulated_rules(rules):
+    """
+    Rules stepped in turn in place of rules, keeping the background of
+    B0 rules empty as described above. Rules without B0 are returned
+    alone.
+    """
+    if 0 not in rules.b:
+        return (rules,)
+    counts = range(9)
+    if 8 in rules.s:
+        return (life.Rules(tuple(n for n in counts if 8 - n not in rules.s),
+                           tuple(n for n in counts if 8 - n not in rules.b)),)
+    return (life.Rules(tuple(n for n in counts if n not in rules.b),
+                       tuple(n for n in counts if n not in rules.s)),
+            life.Rules(tuple(n for n in counts if 8 - n in rules.s),
+                       tuple(n for n in counts if 8 - n in rules.b)))
+
+
+def stabilise(universes, generations, cycle=None):
+    """
+    Step BatchedUniverses until each one repeats an earlier generation.
+    Returns the final cells of every universe, None for those still
+    changing after generations.
+
+    With a cycle of rule tables, every universe is stepped with each of
+    them in turn and only the generations after the last one are compared.
+    """
+    if cycle is not None:
+        generations //= len(cycle)
+    final = [None] * universes.count
+    seen = [{} for _ in range(universes.count)]
+    active = list(range(universes.count))
+
+    for generation in range(generations + 1):
+        still_active = []
+        for position, index in enumerate(active):
+            state = hashlib.blake2b(universes.cells[position].tobytes(),
+                                    digest_size=16).digest()
+            if state in seen[index]:
+                final[index] = universes.cells[position].copy()
+            else:
+                seen[index][state] = generation
+                still_active.append((position, index))
+        if not still_active or generation == generations:
+            break
+
+        # universes that repeated are left out of the batch
+        if len(still_active) < len(active):
+            positions = [position for position, _ in still_active]
+            tables = universes.tables[positions]
+            universes = batchengine.BatchedUniverses.from_cells(
+                universes.cells[positions])
+            universes.tables[:] = tables
+        active = [index for _, index in still_active]
+        if cycle is None:
+            universes.next_generation()
+        else:
+            for table in cycle:
+                universes.tables[:] = table
+                universes.next_generation()
+
+    return final
+
+
+def _cluster(live, start, offsets, width=None, height=None):
+    """
+    Remove the cells reachable from start through offsets from the set
+    live and return them, unwrapped if the grid wraps at width, height
+    """
+    found = [start]
+    for x, y in found:
+        for dx, dy in offsets:
+            cell = (x + dx, y + dy)
+            if width is not None:
+                wrapped = (cell[0] % width, cell[1] % height)
+            else:
+                wrapped = cell
+            if wrapped in live:
+                live.remove(wrapped)
+                found.append(cell)
+    return found
+
+
+def clusters(cells):
+    """ Lists of (x, y) of the live cells of a torus closer than three """
+    width, height = cells.shape
+    live = set(zip(*(axis.tolist() for axis in np.nonzero(cells))))
+    found = []
+    while live:
+        start = live.pop()
+        found.append(_cluster(live, start, CLUSTER_OFFSETS, width, height))
+    return found
+
+
+def parts(cells):
+    """ 8-connected parts of a list of (x, y) """
+    live = set(cells)
+    found = []
+    while live:
+        start = live.pop()
+        found.append(_cluster(live, start, NEIGHBOURS))
+    return found
+
+
+def normalise(cells):
+    """ (shape, origin), the cells moved to start at (0, 0) and how far """
+    x0 = min(x for x, _ in cells)
+    y0 = min(y for _, y in cells)
+    return frozenset((x - x0, y - y0) for x, y in cells), (x0, y0)
+
+
+def evolve(cells, tables):
+    """
+    Run cells alone on an empty plane until they repeat their shape,
+    stepping with each of the rule tables in turn.
+    Returns (prefix, period, phases) with the shape of every phase, prefix
+    is 'xs', 'xp' or 'xq', or 'zz' if they die or do not repeat within
+    MAX_PERIOD generations.
+    """
+    first, start = normalise(cells)
+    origin = start
+    phases = [first]
+
+    width = max(x for x, _ in first) + 1
+    height = max(y for _, y in first) + 1
+    box = np.zeros((width, height), dtype=bool)
+    box[tuple(np.array(sorted(first)).T)] = True
+
+    # two dead cells on every side for every step keep the torus step from
+    # wrapping
+    margin = 2 * len(tables)
+    for generation in range(1, MAX_PERIOD // len(tables) + 1):
+        box = np.pad(box, margin)
+        for table in tables:
+            box = numpyengine.step(box, None, table)
+        origin = (origin[0] - margin, origin[1] - margin)
+        xs, ys = np.nonzero(box)
+        if not len(xs):
+            break
+
+        x0, y0 = int(xs.min()), int(ys.min())
+        box = box[x0:xs.max() + 1, y0:ys.max() + 1]
+        origin = (origin[0] + x0, origin[1] + y0)
+        shape = frozenset(zip((xs - x0).tolist(), (ys - y0).tolist()))
+
+        if shape == first:
+            period = generation * len(tables)
+            if origin != start:
+                return 'xq', period, phases
+            return ('xs' if generation == 1 else 'xp'), period, phases
+        phases.append(shape)
+
+    return 'zz', 0, phases
+
+
+def canonical(phases):
+    """
+    The least sorted cell tuple of all phases in all orientations, as the
+    stamps of Patterns
+    """
+    best = None
+    for shape in phases:
+        pattern = pattern_of(shape)
+        for orientation in ORIENTATIONS:
+            oriented, _ = normalise(pattern.stamp(*orientation))
+            oriented = tuple(sorted(oriented))
+            if best is None or oriented < best:
+                best = oriented
+    return best
+
+
+def pattern_of(shape):
+    """ A Pattern with the cells of a shape """
+    width = max(x for x, _ in shape) + 1
+    height = max(y for _, y in shape) + 1
+    commands = []
+    for y in range(height):
+        if y:
+            commands.append(life.Pattern.Command(1, '$'))
+        for x in range(width):
+            commands.append(life.Pattern.Command(
+                1, 'o' if (x, y) in shape else 'b'))
+    return life.Pattern(width, height, None, commands)
+
+
+def rle_of(cells):
+    """ RLE run data of a tuple of (x, y) """
+    width = max(x for x, _ in cells) + 1
+    height = max(y for _, y in cells) + 1
+    array = np.zeros((width, height), dtype=bool)
+    array[tuple(np.array(cells).T)] = True
+    return ''.join(text for text, _ in rleexport.encode(
+        array, (0, 0, width, height))) + '!'
+
+
+# objects already classified by this process, by rules and shape, in the
+# order they were last seen
+_classified = OrderedDict()
+
+
+def classify(cells, rules, tables):
+    """
+    (name, details) of an object, details is a dict with its kind (the
+    name's prefix), period, population and RLE
+    """
+    key = (rules, normalise(cells)[0])
+    if key in _classified:
+        _classified.move_to_end(key)
+    else:
+        prefix, period, phases = evolve(cells, tables)
+        if prefix == 'zz':
+            # without a cycle the later phases add nothing to compare by
+            phases = phases[:1]
+        best = canonical(phases)
+        digest = hashlib.blake2b(repr(best).encode(),
+                                 digest_size=6).hexdigest()
+        name = '{}{}_{}'.format(prefix, len(best) if prefix == 'xs' else
+                                period or '', digest)
+        _classified[key] = (name, {
+            'kind': prefix, 'period': period, 'population': len(best),
+            'rle': rle_of(best)})
+        if len(_classified) > CLASSIFIED_LIMIT:
+            _classified.popitem(last=False)
+    return _classified[key]
+
+
+def census(cells, rules, tables):
+    """ {name: count} and {name: details} of the objects of a torus """
+    counts = {}
+    details = {}
+
+    def count(name, object_details):
+        counts[name] = counts.get(name, 0) + 1
+        details[name] = object_details
+
+    for cluster in clusters(cells):
+        found = [classify(part, rules, tables) for part in parts(cluster)]
+        if all(object_details['kind'] != 'zz'
+               for _, object_details in found):
+            for name, object_details in found:
+                count(name, object_details)
+        else:
+            # parts that only repeat together are one object
+            count(*classify(cluster, rules, tables))
+    return counts, details
+
+
+def run_batch(job):
+    """
+    Search one batch of soups and return its census.
+
+    job is (rule, rules, seed, first, count, size, soup_size, density,
+    generations).
+    """
+    (rule, rules, seed, first, count, size, soup_size, density,
+     generations) = job
+
+    universes = batchengine.BatchedUniverses.from_cells(
+        soups(seed, first, count, size, soup_size, density))
+    tables = [numpyengine.rule_table(emulated)
+              for emulated in emulated_rules(rules)]
+
+    counts = {}
+    details = {}
+    unstabilised = 0
+    for cells in stabilise(universes, generations, tables):
+        if cells is None:
+            unstabilised += 1
+            continue
+        soup_counts, soup_details = census(cells, rules, tables)
+        for name, number in soup_counts.items():
+            counts[name] = counts.get(name, 0) + number
+        details.update(soup_details)
+
+    return {'rule': rule, 'first': first, 'count': count,
+            'unstabilised': unstabilised, 'counts': counts,
+            'details': details}
+
+
+SETTINGS = ('seed', 'size', 'soup_size', 'density', 'generations')
+
+
+def load_census(filename, settings):
+    """ The census in filename, or an empty one if it does not exist """
+    if filename is None or not os.path.exists(filename):
+        return {'settings': settings, 'rules': {}}
+    with open(filename) as f:
+        saved = json.load(f)
+    if saved['settings'] != settings:
+        raise ValueError('{} was searched with {}'.format(
+            filename, saved['settings']))
+    return saved
+
+
+def save_census(filename, results):
+    """ Write the census, replacing the file only once it is complete """
+    temporary = filename + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+    os.replace(temporary, filename)
+
+
+def add_batch(results, name, batch):
+    """ Add a run_batch result to the census of its rule """
+    entry = results['rules'].setdefault(batch['rule'], {
+        'name': name, 'soups': 0, 'unstabilised': 0, 'objects': {}})
+    entry['soups'] += batch['count']
+    entry['unstabilised'] += batch['unstabilised']
+    for object_name, number in batch['counts'].items():
+        found = entry['objects'].setdefault(
+            object_name, dict(batch['details'][object_name], count=0))
+        found['count'] += number
+
+
+def write_summary(results, top, f):
+    for rule, entry in sorted(results['rules'].items()):
+        print('{} ({}): {} soups, {} unstabilised'.format(
+            entry['name'], rule, entry['soups'], entry['unstabilised']),
+            file=f)
+        ranked = sorted(entry['objects'].items(),
+                        key=lambda item: (-item[1]['count'], item[0]))
+        for name, found in ranked[:top]:
+            print('  {:>10} {:<24} {}'.format(found['count'], name,
+                                             found['rle']), file=f)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+
+    source = parser.add_argument_group('rules to search')
+    source.add_argument('--rules-file', action='append', default=[],
+                        help='rule list in the cool_rules.txt format')
+    source.add_argument('--rules', nargs='+', default=[],
+                        help='rule strings such as B36/S23, B3/S23 if no '
+                             'rules are given')
+
+    parser.add_argument('--soups', type=int, default=1000,
+                        help='soups per rule, counting those already in '
+                             'the census')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--size', type=int, default=64,
+                        help='width and height of the torus')
+    parser.add_argument('--soup-size', type=int, default=16)
+    parser.add_argument('--density', type=float, default=0.5)
+    parser.add_argument('--generations', type=int, default=4000,
+                        help='generations before a soup is given up on')
+    parser.add_argument('--batch', type=int, default=64,
+                        help='soups stepped together by a worker')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='worker processes, 0 for one per CPU')
+    parser.add_argument('--census', default='census.json',
+                        help='census file, continued if it exists')
+    parser.add_argument('--top', type=int, default=10,
+                        help='objects printed per rule')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.soup_size > args.size:
+        parser.error('--soup-size is larger than --size')
+
+    named_rules = []
+    for filename in args.rules_file:
+        named_rules.extend(life.read_rule_list(filename))
+    for rule_string in args.rules:
+        rules = life.parse_rules(rule_string)
+        named_rules.append((life.format_rules(rules), rules))
+    if not named_rules:
+        named_rules.append(('Life', life.Rules((3,), (2, 3))))
+
+    unique = {}
+    for name, rules in named_rules:
+        unique.setdefault(life.format_rules(rules), (name, rules))
+
+    settings = {setting: getattr(args, setting) for setting in SETTINGS}
+    try:
+        results = load_census(args.census, settings)
+    except ValueError as e:
+        parser.error(e)
+
+    jobs = []
+    for rule, (name, rules) in unique.items():
+        done = results['rules'].get(rule, {}).get('soups', 0)
+        for first in range(done, args.soups, args.batch):
+            jobs.append((rule, rules, args.seed, first,
+                         min(args.batch, args.soups - first), args.size,
+                         args.soup_size, args.density, args.generations))
+
+    progress = sys.stderr.isatty()
+    with multiprocessing.Pool(args.workers or None) as pool:
+        # batches come back in order, so every rule's searched soups stay
+        # numbered from 0 without gaps
+        for done, batch in enumerate(pool.imap(run_batch, jobs), 1):
+            add_batch(results, unique[batch['rule']][0], batch)
+            save_census(args.census, results)
+            if progress:
+                print('\r{}/{} batches'.format(done, len(jobs)), end='',
+                      file=sys.stderr)
+        if progress and jobs:
+            print(file=sys.stderr)
+
+    write_summary(results, args.top, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
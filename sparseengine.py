@@ -0,0 +1,79 @@
+from collections import Counter
+
+import life
+
+
+class Engine(life.Engine):
+    """
+    Engine storing only the live cells in a set.
+
+    Work and memory are proportional to the population. On the plane
+    topology cells that leave the grid keep evolving off screen and reappear
+    when they move back into view.
+    """
+
+    topologies = ('torus', 'plane')
+    tracks_changes = True
+
+    def __init__(self, grid, **options):
+        super().__init__(grid, **options)
+        self.reset()
+
+    @property
+    def population(self):
+        return len(self.live)
+
+    def reset(self):
+        grid = self.grid
+        self.live = {(x, y)
+                     for x in range(grid.width)
+                     for y in range(grid.height)
+                     if grid[x][y]}
+
+    def check_rules(self, rules):
+        if 0 in rules.b and self.grid.topology != 'torus':
+            raise ValueError('B0 rules need a bounded topology, they would '
+                             'fill the whole {}'.format(self.grid.topology))
+
+    def cell_changed(self, x, y):
+        if self.grid[x][y]:
+            self.live.add((x, y))
+        else:
+            self.live.discard((x, y))
+
+    def next_generation(self, rules):
+        grid = self.grid
+        width = grid.width
+        height = grid.height
+        torus = grid.topology == 'torus'
+        live = self.live
+        birth = set(rules.b)
+        survival = set(rules.s)
+
+        if torus:
+            counts = Counter(((x + dx) % width, (y + dy) % height)
+                             for x, y in live
+                             for dx, dy in life.MOORE_NEIGHBOURHOOD)
+        else:
+            counts = Counter((x + dx, y + dy)
+                             for x, y in live
+                             for dx, dy in life.MOORE_NEIGHBOURHOOD)
+
+        if 0 in birth:
+            self.check_rules(rules)
+            candidates = ((x, y) for x in range(width) for y in range(height))
+        else:
+            candidates = counts.keys()
+
+        new_live = {cell for cell in candidates
+                    if counts[cell] in (survival if cell in live else birth)}
+        if 0 in survival:
+            new_live.update(cell for cell in live if cell not in counts)
+
+        changes = [(x, y) for x, y in new_live.symmetric_difference(live)
+                   if 0 <= x < width and 0 <= y < height]
+        for x, y in changes:
+            grid[x][y] = not grid[x][y]
+
+        self.live = new_live
+        return changes
@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+
+import life
+
+
+class ParseErrorLineTest(unittest.TestCase):
+    def parse_error(self, text):
+        """ The PatternParseError raised for an RLE file holding text """
+        with tempfile.NamedTemporaryFile('w', suffix='.rle',
+                                         delete=False) as f:
+            f.write(text)
+        self.addCleanup(os.remove, f.name)
+        with self.assertRaises(life.PatternParseError) as raised:
+            life.Pattern.parsefile(f.name)
+        return raised.exception
+
+    def test_unterminated_single_line(self):
+        error = self.parse_error('x = 3, y = 1\n3o3')
+        self.assertEqual(error.line_number, 2)
+
+    def test_terminated_single_line(self):
+        error = self.parse_error('x = 3, y = 1\n3o3!\n#C after the end\n')
+        self.assertEqual(error.line_number, 2)
+
+    def test_comments_before_the_header(self):
+        error = self.parse_error('#N name\n#C comment\nx = 3, y = 2\n'
+                                 '3o$\n#C between\n3\n')
+        self.assertEqual(error.line_number, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import life
+
+TILE_SIZE = 16
+
+
+class Engine(life.Engine):
+    """
+    Incremental engine that only re-evaluates tiles that changed in the
+    previous generation, and their neighbouring tiles.
+
+    A cell whose whole neighbourhood was unchanged last generation keeps its
+    state, so quiet regions cost nothing. Every tile is evaluated after a
+    reset, a resize or a change of rules.
+    """
+
+    tracks_changes = True
+
+    def __init__(self, grid, tile_size=TILE_SIZE, **options):
+        super().__init__(grid, **options)
+        self.tile_size = tile_size
+        self.active_tiles = 0
+        self.reset()
+
+    @property
+    def tiles_x(self):
+        return -(-self.grid.width // self.tile_size)
+
+    @property
+    def tiles_y(self):
+        return -(-self.grid.height // self.tile_size)
+
+    def reset(self):
+        self._rules = None
+        self._changed_tiles = set()
+
+    def cell_changed(self, x, y):
+        self._changed_tiles.add((x // self.tile_size, y // self.tile_size))
+
+    def next_generation(self, rules):
+        grid = self.grid
+        width = grid.width
+        height = grid.height
+        size = self.tile_size
+        birth = set(rules.b)
+        survival = set(rules.s)
+
+        if rules != self._rules:
+            self._rules = rules
+            active = {(tx, ty)
+                      for tx in range(self.tiles_x)
+                      for ty in range(self.tiles_y)}
+        else:
+            active = self._neighbouring_tiles(self._changed_tiles)
+        self.active_tiles = len(active)
+
+        changes = []
+        for tx, ty in active:
+            ystart = ty * size
+            yend = min(ystart + size, height)
+            for x in range(tx * size, min(tx * size + size, width)):
+                left = grid[(x - 1) % width]
+                column = grid[x]
+                right = grid[(x + 1) % width]
+                for y in range(ystart, yend):
+                    up = (y - 1) % height
+                    down = (y + 1) % height
+                    count = (left[up] + left[y] + left[down] +
+                             column[up] + column[down] +
+                             right[up] + right[y] + right[down])
+                    if column[y]:
+                        if count not in survival:
+                            changes.append((x, y))
+                    elif count in birth:
+                        changes.append((x, y))
+
+        self._changed_tiles = set()
+        for x, y in changes:
+            grid[x][y] = not grid[x][y]
+            self._changed_tiles.add((x // size, y // size))
+
+        return changes
+
+    def _neighbouring_tiles(self, tiles):
+        tiles_x = self.tiles_x
+        tiles_y = self.tiles_y
+        return {((tx + dx) % tiles_x, (ty + dy) % tiles_y)
+                for tx, ty in tiles
+                for dx in (-1, 0, 1)
+                for dy in (-1, 0, 1)}
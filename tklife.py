@@ -1,124 +1,713 @@
 from tkinter import Canvas
 
+from fractions import Fraction
 import os
 import sys
-from tkinter.filedialog import askopenfilenames
+import time
+from tkinter.filedialog import (askopenfilename, askopenfilenames,
+                                asksaveasfilename)
+from tkinter.messagebox import showerror
 
 from life import CellGrid
+import cycles
+import history
+import instruments
 import life
+import patterncache
+import simworker
 import tkinter as tk
 import tkinter.ttk as ttk
 
+# grid line images kept for reuse
+GRID_IMAGES = 4
+
+
+class _FillRecorder(object):
+    """
+    Stands in for the canvas given to an old style draw_func, keeping the
+    fill of the rectangle it creates instead of drawing it
+    """
+
+    def __init__(self, canvas):
+        self._canvas = canvas
+        self.fill = None
+
+    def create_rectangle(self, *args, **kw):
+        self.fill = kw.get('fill', self.fill)
+
+    def __getattr__(self, name):
+        return getattr(self._canvas, name)
+
+
+def legacy_draw_func(func):
+    """
+    Adapt an old style func(locals_), which drew one cell from the locals of
+    the former CellCanvas.draw_cell, to colors(canvas, births, deaths)
+    """
+    def colors(canvas, births, deaths):
+        default = canvas._settings['cell']['color']
+        recorder = _FillRecorder(canvas)
+        result = []
+        for x, y in births:
+            # def_draw drew the cell in the default colour
+            recorder.fill = default
+            func({'self': recorder, 'x': x, 'y': y,
+                  'x_canvas': canvas.canvas_x(x),
+                  'y_canvas': canvas.canvas_y(y),
+                  'color': default, 'tag': 'cell', 'def_draw': lambda: None})
+            result.append(recorder.fill)
+        return result
+    return colors
+
+
+def load_draw_func(name):
+    """ colors() of the draw_func plugin module name, None if there is none """
+    try:
+        module = __import__(name)
+    except (ValueError, ImportError):
+        return None
+    if hasattr(module, 'colors'):
+        return module.colors
+    if hasattr(module, 'func'):
+        return legacy_draw_func(module.func)
+    return None
+
 
 class CellCanvas(CellGrid, Canvas):
     def __init__(self, settings, widthfunc, heightfunc,
-                 master=None, cellsize=None, cnf={}, **kw):
+                 master=None, cellsize=None, cnf={}, view_size=None, **kw):
 
         self._settings = settings
         self.iteration = 0
 
+        # on a plane the sparse engine keeps cells off the grid that the
+        # history cannot restore, so there is no going back there
+        memory_limit = int(self._settings['history']['memory_limit'])
+        self.history = None
+        if (memory_limit > 0 and
+                self._settings['grid']['topology'] != 'plane'):
+            self.history = history.History(
+                memory_limit,
+                int(self._settings['history']['keyframe_interval']))
+
+        # the hashes only cover the grid, a plane's off-grid cells would
+        # make generations that differ look the same
+        self.cycles = None
+        if self._settings['grid']['topology'] != 'plane':
+            self.cycles = cycles.CycleDetector(
+                int(self._settings['cycles']['table_size']))
+        self._cycle_rules = None
+
+        self.instruments = instruments.Instruments()
+
         if cellsize is None:
             cellsize = int(self._settings['cell']['start_size'])
 
-        CellGrid.__init__(self, cellsize, widthfunc, heightfunc)
+        # the grid keeps the size it gets at the start cellsize, zooming and
+        # panning only move the view over it
+        CellGrid.__init__(self, cellsize, widthfunc, heightfunc,
+                          self._settings['grid']['engine'],
+                          self._settings['grid']['topology'],
+                          {'workers': int(self._settings['grid']['workers'])})
+
+        # at most view_size (width, height) pixels of the grid are shown,
+        # with shrink cells across every pixel when zoomed out below one
+        if view_size is None:
+            view_size = (self.width * cellsize, self.height * cellsize)
+        self.view_size = view_size
+        self.view_x = 0
+        self.view_y = 0
+        self.shrink = 1
+        self.overview = None
 
         Canvas.__init__(self, master, cnf, **kw)
-        self.config(
-            width=self.canvaswidth,
-            height=self.canvasheight,
-            highlightthickness=0, closeenough=0)
-
-        try:
-            if self._settings['cell']['draw_func'] is not None:
-                self.draw_func = __import__(self._settings
-                                            ['cell']['draw_func']).func
-        except (ValueError, ImportError):
-            self.draw_func = None
-
-    def draw_cell(self, x, y, color=None, tag='cell'):
-        x_canvas = self.canvas(x)
-        y_canvas = self.canvas(y)
-
-        def def_draw():
-            self.create_rectangle(
-                x_canvas, y_canvas,
-                x_canvas + self.cellsize,
-                y_canvas + self.cellsize,
-                fill=color,
-                width=0, tag=tag)
-
+        self.config(highlightthickness=0, closeenough=0)
+
+        self.draw_func = load_draw_func(self._settings['cell']['draw_func'])
+
+        # raster mode paints cells into one image instead of canvas items,
+        # with a draw_func it keeps the colour of every live cell
+        self.raster = self._settings['cell']['render'] == 'raster'
+        self._image = None
+        self._colors = {}
+        self._grid_images = {}
+        self._selection_image = None
+
+        self.ages = None
+        color_by = self._settings['age']['color_by']
+        if color_by != 'none':
+            # age colouring needs numpy, only import it when it is used
+            import cellage
+            self.ages = cellage.AgeLayer(
+                cellage.Palette.from_settings(self._settings['age']), color_by)
+            self.ages.reset(self)
+
+        self.redraw()
+
+    def _create_cell(self, x, y, color, tag='cell'):
+        x_canvas = self.canvas_x(x)
+        y_canvas = self.canvas_y(y)
+        self.create_rectangle(
+            x_canvas, y_canvas,
+            x_canvas + self.cellsize,
+            y_canvas + self.cellsize,
+            fill=color,
+            width=0, tag=tag)
+
+    def cell_colors(self, births, deaths=(), color=None):
+        """ Colour of every cell in births, from draw_func unless given """
+        if color is None and self.ages is not None:
+            color = self.ages.newborn_color
+        if color is None and self.draw_func is not None:
+            colors = self.draw_func(self, births, deaths)
+            if not isinstance(colors, str):
+                return colors
+            color = colors
         if color is None:
             color = self._settings['cell']['color']
-            if self.draw_func is not None:
-                self.draw_func(locals())
-            else:
-                def_draw()
-        else:
-            def_draw()
+        return [color] * len(births)
 
     def draw_all_cells(self, prev_generation, color=None):
-        def analyze_cell(x, y):
-            if self[x][y] ^ prev_generation[x][y]:
-                if self[x][y]:
-                    self.draw_cell(x, y, color)
-                else:
-                    self.undraw_cell(x, y)
+        self.draw_changed_cells(self.changed_cells(prev_generation), color)
 
-        for x in range(self.width):
-            for y in range(self.height):
-                analyze_cell(x, y)
+    def draw_changed_cells(self, changed_cells, color=None):
+        if self.overview is not None:
+            self.overview.update(self, changed_cells)
+            self.paint_overview()
+            return
+
+        changed_cells = self._cells_in_view(changed_cells)
+        births = [(x, y) for x, y in changed_cells if self[x][y]]
+        deaths = [(x, y) for x, y in changed_cells if not self[x][y]]
+
+        if self.raster:
+            if self.draw_func is not None:
+                for cell in deaths:
+                    self._colors.pop(cell, None)
+                self._colors.update(
+                    zip(births, self.cell_colors(births, deaths, color)))
+            self.paint_rows({y for _, y in changed_cells}, color)
+            return
+
+        for x, y in deaths:
+            self.undraw_cell(x, y)
+        for (x, y), cell_color in zip(births,
+                                      self.cell_colors(births, deaths, color)):
+            self._create_cell(x, y, cell_color)
+
+    def paint_ages(self, cells):
+        """ Repaint the (x, y, color) cells from the age layer """
+        cells = self._cells_in_view(cells)
+        if self.raster:
+            for x, y, color in cells:
+                if color is None:
+                    self._colors.pop((x, y), None)
+                else:
+                    self._colors[(x, y)] = color
+            self.paint_rows({y for _, y, _ in cells})
+            return
+
+        for x, y, color in cells:
+            self.undraw_cell(x, y)
+            if color is not None:
+                self._create_cell(x, y, color)
+
+    def paint_overview(self):
+        """ Draw the overview's blocks shaded by their live cells """
+        self._image.configure(
+            data=self.overview.ppm(
+                self.cellsize,
+                self._rgb(self._settings['background']['color']),
+                self._rgb(self._settings['cell']['color'])),
+            format='PPM')
+
+    def _rgb(self, color):
+        return tuple(value >> 8 for value in self.winfo_rgb(color))
+
+    def draw_step(self, changed_cells, repaint=None, color=None):
+        """
+        Draw the changed cells of a step, repaint is what the age layer
+        returned for it
+        """
+        if repaint is not None and self.overview is None:
+            self.paint_ages(repaint)
+        else:
+            self.draw_changed_cells(changed_cells, color)
 
     def undraw_cell(self, x, y):
         """
         Deletes all canvas objects at cell coordinates x and y,
         presumably one cell
         """
+        if not self.in_view(x, y):
+            return
+        if self.overview is not None:
+            self.draw_changed_cells([(x, y)])
+            return
+
+        if self.raster:
+            self._colors.pop((x, y), None)
+            x_canvas = self.canvas_x(x)
+            y_canvas = self.canvas_y(y)
+            self._image.put(self._settings['background']['color'],
+                            to=(x_canvas, y_canvas,
+                                x_canvas + self.cellsize,
+                                y_canvas + self.cellsize))
+            return
 
         # add 1 to canvas coords to avoid grid lines
-        x_loc = self.canvas(x) + 1
-        y_loc = self.canvas(y) + 1
+        x_loc = self.canvas_x(x) + 1
+        y_loc = self.canvas_y(y) + 1
 
         for item in self.find_overlapping(x_loc, y_loc,
                                           x_loc, y_loc):
-            self.delete(item)
+            if 'cell' in self.gettags(item):
+                self.delete(item)
 
     def undraw_all_cells(self):
         """ Deletes all canvas objects with a tag of 'cell' """
         self.delete('cell')
+        if self.raster or self.overview is not None:
+            self._create_image()
+        else:
+            self.delete('raster')
+            self._image = None
 
-    def draw_grid(self, color=None):
+    def paint_rows(self, rows, color=None):
+        """
+        Repaint whole rows of the raster image, each row is one pixel line
+        tiled down the height of a cell
+        """
+        if color is None:
+            color = self._settings['cell']['color']
 
+        alive = ' '.join([color] * self.cellsize)
+        dead = ' '.join([self._settings['background']['color']] *
+                        self.cellsize)
+        columns = self[self.view_x:self.view_x + self.view_width]
+
+        # cells coloured by draw_func or their age get a pixel line of their
+        # own colour
+        lines = {}
+
+        def tile(x, y, state):
+            cell_color = self._colors.get((x, y))
+            if cell_color is None:
+                return alive if state else dead
+            if cell_color not in lines:
+                lines[cell_color] = ' '.join([cell_color] * self.cellsize)
+            return lines[cell_color]
+
+        for y in rows:
+            if not self.view_y <= y < self.view_y + self.view_height:
+                continue
+            if self._colors:
+                line = ' '.join([tile(x, y, column[y]) for x, column
+                                 in enumerate(columns, self.view_x)])
+            else:
+                line = ' '.join([alive if column[y] else dead
+                                 for column in columns])
+            self._image.put('{' + line + '}',
+                            to=(0, self.canvas_y(y),
+                                self.canvaswidth, self.canvas_y(y + 1)))
+
+    def _create_image(self):
+        """ Replace the raster image with a blank one the size of the view """
+        self._colors = {}
+        self.delete('raster')
+        self._image = tk.PhotoImage(master=self, width=self.canvaswidth,
+                                    height=self.canvasheight)
+        self.create_image(0, 0, image=self._image, anchor=tk.NW, tag='raster')
+        self.tag_lower('raster')
+
+    def draw_grid(self, color=None):
+        """
+        Show the grid lines as one image tiled from a single cell, cached by
+        cell size, colour and canvas size. Cells smaller than
+        line_size_limit pixels are shown without lines.
+        """
         if color is None:
             color = self._settings['grid']['color']
 
         self.delete('grid_line')
+        if (self.overview is not None or self.canvaswidth == 0 or
+                self.canvasheight == 0 or self.cellsize <
+                int(self._settings['grid']['line_size_limit'])):
+            return
+
+        key = (self.cellsize, color, self.canvaswidth, self.canvasheight)
+        image = self._grid_images.get(key)
+        if image is None:
+            if len(self._grid_images) >= GRID_IMAGES:
+                del self._grid_images[next(iter(self._grid_images))]
+            image = self._grid_images[key] = self._grid_image(*key)
+
+        self.create_image(0, 0, image=image, anchor=tk.NW, tag='grid_line')
+        self.tag_lower('grid_line')
+        self.tag_lower('raster')
+
+    def _grid_image(self, cellsize, color, width, height):
+        """ Lines on both sides of every cell edge, transparent elsewhere """
+        tile = tk.PhotoImage(master=self, width=cellsize, height=cellsize)
+        last = cellsize - 1
+        for box in ((0, 0, 1, cellsize), (last, 0, cellsize, cellsize),
+                    (0, 0, cellsize, 1), (0, last, cellsize, cellsize)):
+            tile.put(color, to=box)
+
+        # copying a small image to a larger region tiles it
+        image = tk.PhotoImage(master=self, width=width, height=height)
+        image.tk.call(str(image), 'copy', str(tile),
+                      '-to', 0, 0, width, height)
+        return image
 
-        for half_line in [self.cellsize - 1, self.cellsize]:
-            for x in range(half_line, self.canvaswidth,
-                           self.cellsize):
+    @property
+    def zoom(self):
+        """ Pixels per cell, below 1 when several cells share a pixel """
+        return self.cellsize / self.shrink
+
+    @zoom.setter
+    def zoom(self, new_zoom):
+        self.set_view(new_zoom)
+
+    def _scale(self, zoom):
+        """ (cellsize, shrink) of a zoom """
+        if zoom <= 0:
+            raise ValueError('Zoom must be positive, got {}'.format(zoom))
+        # whole pixel cell sizes are never smaller than size_limit
+        limit = int(self._settings['cell']['size_limit'])
+        if zoom >= 1:
+            return max(int(zoom), limit), 1
+
+        # zooming out further than the whole grid shows nothing new
+        most = max(1, -(-self.width // max(1, self.view_size[0])),
+                   -(-self.height // max(1, self.view_size[1])))
+        most = 1 << (most - 1).bit_length()
+        shrink = min(int(round(1 / zoom)), most)
+        if shrink == 1:
+            return max(1, limit), 1
+        return 1, shrink
+
+    @property
+    def view_width(self):
+        """ Columns of cells in view """
+        return min(self.width, self.view_size[0] * self.shrink //
+                   self.cellsize)
 
-                self.create_line(
-                    x, 0, x, self.canvasheight,
-                    fill=color, tag='grid_line')
+    @property
+    def view_height(self):
+        """ Rows of cells in view """
+        return min(self.height, self.view_size[1] * self.shrink //
+                   self.cellsize)
 
-            for y in range(half_line, self.canvasheight,
-                           self.cellsize):
+    @property
+    def canvaswidth(self):
+        return -(-self.view_width // self.shrink) * self.cellsize
 
-                self.create_line(
-                    0, y, self.canvaswidth, y,
-                    fill=color, tag='grid_line')
+    @property
+    def canvasheight(self):
+        return -(-self.view_height // self.shrink) * self.cellsize
+
+    def set_view(self, zoom=None, x=None, y=None):
+        """
+        Show the cells from (x, y) at the top left at zoom pixels per cell,
+        or 1 / zoom cells per pixel below 1. The cells are left as they are.
+        """
+        if self._move_view(zoom, x, y):
+            self.redraw()
+
+    def _move_view(self, zoom=None, x=None, y=None):
+        """ set_view without drawing, returns True if the view changed """
+        view = (self.cellsize, self.shrink, self.view_x, self.view_y)
+        if zoom is not None:
+            self._cellsize, self.shrink = self._scale(zoom)
+        if x is not None:
+            self.view_x = x
+        if y is not None:
+            self.view_y = y
+        self.view_x = max(0, min(self.view_x, self.width - self.view_width))
+        self.view_y = max(0, min(self.view_y, self.height - self.view_height))
+        return view != (self.cellsize, self.shrink, self.view_x, self.view_y)
+
+    def zoom_at(self, zoom, x_canvas, y_canvas):
+        """ Zoom keeping the cell at canvas (x_canvas, y_canvas) in place """
+        x = self.grid_x(x_canvas)
+        y = self.grid_y(y_canvas)
+        cellsize, shrink = self._scale(zoom)
+        self.set_view(zoom, x - x_canvas * shrink // cellsize,
+                      y - y_canvas * shrink // cellsize)
+
+    def pan(self, dx, dy):
+        """ Move the view by (dx, dy) cells """
+        self.set_view(x=self.view_x + dx, y=self.view_y + dy)
+
+    def redraw(self):
+        """ Draw everything in view again """
+        self.config(width=self.canvaswidth, height=self.canvasheight)
+
+        # cells smaller than overview_below pixels are shaded in blocks
+        self.overview = None
+        if (self.shrink > 1 or
+                self.cellsize <
+                int(self._settings['cell']['overview_below'])):
+            # overviews need numpy, only import it when they are used
+            import overview
+            self.overview = overview.Overview(
+                self, self.view_x, self.view_y, self.view_width,
+                self.view_height, self.shrink)
+
+        self.undraw_all_cells()
+        self.draw_grid()
+        if self.overview is not None:
+            self.paint_overview()
+        elif self.ages is not None:
+            self.paint_ages(self.ages.region(
+                self.view_x, self.view_y, self.view_width, self.view_height))
+        else:
+            self.draw_changed_cells(
+                [(x, y) for x, column in enumerate(
+                    self[self.view_x:self.view_x + self.view_width],
+                    self.view_x)
+                 for y in range(self.view_y, self.view_y + self.view_height)
+                 if column[y]])
+
+    def in_view(self, x, y):
+        return (self.view_x <= x < self.view_x + self.view_width and
+                self.view_y <= y < self.view_y + self.view_height)
+
+    def _cells_in_view(self, cells):
+        """ The cells starting with (x, y) that are in view """
+        if self.view_width == self.width and self.view_height == self.height:
+            return cells
+        return [cell for cell in cells if self.in_view(cell[0], cell[1])]
+
+    def canvas_x(self, x):
+        """ Canvas x of the left of column x """
+        return (x - self.view_x) // self.shrink * self.cellsize
+
+    def canvas_y(self, y):
+        """ Canvas y of the top of row y """
+        return (y - self.view_y) // self.shrink * self.cellsize
+
+    def grid_x(self, x_canvas):
+        """ Column at canvas x """
+        return self.view_x + int(x_canvas * self.shrink / self.cellsize)
+
+    def grid_y(self, y_canvas):
+        """ Row at canvas y """
+        return self.view_y + int(y_canvas * self.shrink / self.cellsize)
+
+    def show_generation(self, iteration, cells, color=None):
+        """ Display a generation that was computed elsewhere """
+        if (self.history is not None and
+                self.history.current != self.iteration):
+            self.history.record(self.iteration, self)
 
-    def new_gen(self, rules, color=None):
         prev_generation = self.copy_grid()
-        self.next_generation(rules)
-        self.draw_all_cells(prev_generation, color)
+        self.setgrid(cells)
+        changed_cells = self.changed_cells(prev_generation)
+        repaint = None
+        if self.ages is not None:
+            repaint = self.ages.step(changed_cells,
+                                     iteration - self.iteration)
+        self.draw_step(changed_cells, repaint, color)
+        self.iteration = iteration
+        if self.cycles is not None:
+            self.cycles.invalidate()
+
+        # generations the worker skipped are recorded as gaps
+        if self.history is not None:
+            self.history.record(iteration, self, changed_cells)
+
+    def show_selection(self, cells, colors):
+        """
+        Draw the (x, y) cells in colors above everything else, as one image
+        the size of the view with horizontal runs of a colour put at once
+        """
+        self.delete('selection')
+        image = self._selection_image
+        if (image is None or image.width() != self.canvaswidth or
+                image.height() != self.canvasheight):
+            image = self._selection_image = tk.PhotoImage(
+                master=self, width=self.canvaswidth, height=self.canvasheight)
+        else:
+            image.blank()
+
+        rows = {}
+        for (x, y), color in zip(cells, colors):
+            if self.in_view(x, y):
+                row = rows.setdefault(self.canvas_y(y), {})
+                row[self.canvas_x(x)] = color
+
+        size = self.cellsize
+        for y_canvas, row in rows.items():
+            xs = sorted(row)
+            start = xs[0]
+            for previous, x_canvas in zip(xs, xs[1:] + [None]):
+                if x_canvas != previous + size or row[x_canvas] != row[start]:
+                    image.put(row[start], to=(
+                        start, y_canvas, previous + size, y_canvas + size))
+                    start = x_canvas
+
+        self.create_image(0, 0, image=image, anchor=tk.NW, tag='selection')
+
+    def invert_cells(self, cells):
+        """
+        Flip the (x, y) cells, a cell listed twice flips back, and draw the
+        ones that changed at once. Returns the changed cells.
+        """
+        changed = set()
+        for x, y in cells:
+            self[x][y] = not self[x][y]
+            changed.symmetric_difference_update(((x, y),))
+        changed = list(changed)
+
+        if self.engine is not None:
+            for x, y in changed:
+                self.engine.cell_changed(x, y)
+        if self.cycles is not None:
+            self.cycles.invalidate()
+        if self.history is not None:
+            self.history.invalidate()
+        repaint = None
+        if self.ages is not None:
+            repaint = self.ages.set_cells(changed,
+                                          [self[x][y] for x, y in changed])
+        self.draw_step(changed, repaint)
+        return changed
+
+    def set_cell(self, x, y, state):
+        """ Set one cell and draw it like any other edit """
+        if self[x][y] != state:
+            self.invert_cells([(x, y)])
+
+    def new_gen(self, rules, color=None):
+        if (self.history is not None and
+                self.history.current != self.iteration):
+            self.history.record(self.iteration, self)
+
+        if self.cycles is not None:
+            if rules != self._cycle_rules:
+                self._cycle_rules = rules
+                self.cycles.invalidate()
+            if not self.cycles.valid:
+                self.cycles.observe(self.iteration, self)
+
+        timer = self.instruments.timer()
+        if self.engine is not None and self.engine.tracks_changes:
+            changed_cells = self.next_generation(rules)
+            timer.lap('next_generation')
+        else:
+            prev_generation = self.copy_grid()
+            timer.lap('copy_grid')
+            self.next_generation(rules)
+            timer.lap('next_generation')
+            changed_cells = self.changed_cells(prev_generation)
+            timer.lap('changed_cells')
+
+        repaint = None
+        if self.ages is not None:
+            repaint = self.ages.step(changed_cells)
+        self.draw_step(changed_cells, repaint, color)
+        timer.lap('draw')
         self.iteration += 1
 
-    def reset(self):
+        if self.cycles is not None:
+            self.cycles.observe(self.iteration, self, changed_cells)
+        if self.history is not None:
+            self.history.record(self.iteration, self, changed_cells)
+        timer.lap('bookkeeping')
+
+        if timer:
+            self.instruments.emit(
+                'new_gen', timer, iteration=self.iteration,
+                population=self.population, changed=len(changed_cells),
+                items=len(self.find_all()))
+
+    def fast_forward(self, generation, rules, color=None, cycle=None):
+        """
+        Jump to a later generation of the detected cycle, stepping through
+        less than one period of it. cycle defaults to the one detected on
+        the canvas under rules.
+        """
+        if (cycle is None and self.cycles is not None and
+                self.cycles.valid and rules == self._cycle_rules):
+            cycle = self.cycles.cycle
+        if cycle is None or self.iteration < cycle.start:
+            raise ValueError('no cycle has been detected')
+        if generation < self.iteration:
+            raise ValueError('cannot fast forward to an earlier generation')
+
+        for _ in range((generation - self.iteration) % cycle.period):
+            self.new_gen(rules, color)
+        self.iteration = generation
+        if self.history is not None:
+            self.history.record(self.iteration, self)
+
+    def seek(self, generation, color=None):
+        """ Show a generation that is still in the history """
+        changed_cells = self.history.seek(generation, self)
+        for x, y in changed_cells:
+            self[x][y] = not self[x][y]
+        if self.engine is not None:
+            for x, y in changed_cells:
+                self.engine.cell_changed(x, y)
+        repaint = None
+        if self.ages is not None:
+            # the earlier ages are not known, changed cells start over
+            repaint = self.ages.set_cells(
+                changed_cells, [self[x][y] for x, y in changed_cells])
+        self.draw_step(changed_cells, repaint, color)
+        self.iteration = generation
+        if self.cycles is not None:
+            self.cycles.invalidate()
+
+    def rewind(self, color=None):
+        """
+        Go back to the newest generation in the history before this one,
+        returns False if there is none
+        """
+        if self.history is None:
+            return False
+        generation = self.history.previous(self.iteration)
+        if generation is None:
+            return False
+        self.seek(generation, color)
+        return True
+
+    def save_checkpoint(self, filename, rules):
+        # checkpoints need numpy, only import it when they are used
+        import checkpoint
+        checkpoint.save(self, filename, rules, self.iteration)
+
+    def load_checkpoint(self, filename):
+        """ Show a saved grid and return its Checkpoint """
+        import checkpoint
+        prev_generation = self.copy_grid()
+        saved = checkpoint.restore(self, filename)
+        repaint = None
+        if self.ages is not None:
+            repaint = self.ages.reset(self)
+        self.draw_step(self.changed_cells(prev_generation), repaint)
+        self.iteration = saved.iteration
+        if self.cycles is not None:
+            self.cycles.invalidate()
+        if self.history is not None:
+            self.history.clear()
+        return saved
+
+    def reset(self, zoom=None):
+        """ Clear the grid and draw it once, at a new zoom if one is given """
+        if zoom is not None:
+            self._move_view(zoom)
         CellGrid.reset(self)
-        self.undraw_all_cells()
-        self.draw_grid()
+        if self.ages is not None:
+            self.ages.reset(self)
+        self.redraw()
         self.iteration = 0
+        if self.cycles is not None:
+            self.cycles.invalidate()
+        if self.history is not None:
+            self.history.clear()
 
     @property
     def cellsize(self):
@@ -126,9 +715,7 @@ class CellCanvas(CellGrid, Canvas):
 
     @cellsize.setter
     def cellsize(self, new_cellsize):
-        self._cellsize = new_cellsize
-        self._calc_dimensions()
-        self.reset()
+        self.set_view(new_cellsize)
 
 
 class LifeApp(tk.Tk):
@@ -164,15 +751,22 @@ class LifeApp(tk.Tk):
         bot_frame.pack(side=tk.BOTTOM, fill=tk.X)
         # Top Frame
 
+        view_size = (int(self.winfo_screenwidth() * 0.9),
+                     int(self.winfo_screenheight() * 0.8))
+
+        # a grid size of 0 fills the view at the start cell size
         def widthfunc(cellsize):
-            return int(self.winfo_screenwidth() * 0.9 / cellsize)
+            return (int(self._settings['grid']['width']) or
+                    view_size[0] // cellsize)
 
         def heightfunc(cellsize):
-            return int(self.winfo_screenheight() * 0.8 / cellsize)
+            return (int(self._settings['grid']['height']) or
+                    view_size[1] // cellsize)
 
         self.cells = CellCanvas(self._settings,
                                 widthfunc, heightfunc,
                                 master=main_frame,
+                                view_size=view_size,
                                 background=self._settings['background']
                                                          ['color'])
 
@@ -182,7 +776,32 @@ class LifeApp(tk.Tk):
         self.cells.bind('<Motion>', self.mouse_moved_in_canvas)
         self.cells.bind('<Button-2>',
                         lambda event: self.patternselection.rotate_pattern())
+        self.cells.bind('<ButtonPress-3>', self.drag_started)
+        self.cells.bind('<B3-Motion>', self.dragged)
+        self.cells.bind('<MouseWheel>', lambda event: self.zoom_by(
+            2 if event.delta > 0 else 0.5, event.x, event.y))
+        self.cells.bind('<Button-4>',
+                        lambda event: self.zoom_by(2, event.x, event.y))
+        self.cells.bind('<Button-5>',
+                        lambda event: self.zoom_by(0.5, event.x, event.y))
         self.cells.pack()
+        self._drag = None
+        self.check_rules()
+
+        def view_key(func):
+            """ Leave keys typed into an entry to the entry """
+            def handler(event):
+                if not isinstance(event.widget, tk.Entry):
+                    func()
+            return handler
+
+        self.bind('<plus>', view_key(lambda: self.zoom_by(2)))
+        self.bind('<minus>', view_key(lambda: self.zoom_by(0.5)))
+        for key, dx, dy in (('<Left>', -1, 0), ('<Right>', 1, 0),
+                            ('<Up>', 0, -1), ('<Down>', 0, 1)):
+            self.bind(key, view_key(lambda dx=dx, dy=dy: self.pan(
+                dx * max(1, self.cells.view_width // 4),
+                dy * max(1, self.cells.view_height // 4))))
 
         self.pattern_info = tk.StringVar()
         pattern_info_label = ttk.Label(
@@ -196,20 +815,30 @@ class LifeApp(tk.Tk):
             for o in range(9):
                 ttk.Label(top_frame, text=str(o)).pack(side=tk.LEFT)
                 ttk.Checkbutton(
-                    top_frame, variable=ruleset[o]).pack(side=tk.LEFT)
+                    top_frame, variable=ruleset[o],
+                    command=self.check_rules).pack(side=tk.LEFT)
 
         # Bot Frame
         run_button = ttk.Button(bot_frame, text="Start")
         run_button.pack(side=tk.LEFT, padx=10)
 
+        back_button = ttk.Button(
+            bot_frame, text="Back",
+            state='disabled' if self.cells.history is None else 'normal')
+        back_button['command'] = self.rewind
+        back_button.pack(side=tk.LEFT, padx=10)
+
         ttk.Label(bot_frame, text="Speed").pack(side=tk.LEFT, padx=15)
 
         def update_slider_moved(new_updaterate):
             self.cell_updater.set_update_rate(
                 round(int(new_updaterate[:new_updaterate.find('.')]), -2))
 
+        # a threaded simulation can also run as fast as possible, at 0 ms
+        threaded = self._settings['simulation'].getboolean('threaded')
         update_rate_slider = ttk.Scale(
-            bot_frame, from_=100, to=500, orient=tk.HORIZONTAL)
+            bot_frame, from_=0 if threaded else 100, to=500,
+            orient=tk.HORIZONTAL)
         update_rate_slider['command'] = update_slider_moved
         update_rate_slider.pack(side=tk.LEFT, padx=15)
 
@@ -220,8 +849,9 @@ class LifeApp(tk.Tk):
         ttk.Label(bot_frame, text='Cell Size').pack(side=tk.LEFT, padx=15)
 
         self.entry_str = tk.StringVar()
-        self.cell_size = int(self._settings['cell']['start_size'])
+        self.cell_size = self.cells.cellsize
         cell_size_entry = ttk.Entry(bot_frame, textvariable=self.entry_str)
+        cell_size_entry.bind('<Return>', lambda event: self.apply_cell_size())
         cell_size_entry.pack(side=tk.LEFT, padx=15)
 
         def open_files():
@@ -233,6 +863,41 @@ class LifeApp(tk.Tk):
 
         open_file_button.pack(side=tk.RIGHT, padx=10)
 
+        checkpoint_types = [('Checkpoints', '*.ckpt'), ('All files', '*')]
+
+        def save_checkpoint():
+            filename = asksaveasfilename(
+                initialdir='.', title='Save grid', defaultextension='.ckpt',
+                filetypes=checkpoint_types)
+            if filename:
+                self.save_checkpoint(filename)
+
+        def load_checkpoint():
+            filename = askopenfilename(
+                initialdir='.', title='Load grid', filetypes=checkpoint_types)
+            if filename:
+                self.load_checkpoint(filename)
+
+        load_button = ttk.Button(bot_frame, text="Load")
+        load_button['command'] = load_checkpoint
+        load_button.pack(side=tk.RIGHT, padx=10)
+
+        def export_rle():
+            filename = asksaveasfilename(
+                initialdir='.', title='Export pattern',
+                defaultextension='.rle',
+                filetypes=[('RLE patterns', '*.rle'), ('All files', '*')])
+            if filename:
+                self.export_rle(filename)
+
+        export_button = ttk.Button(bot_frame, text="Export")
+        export_button['command'] = export_rle
+        export_button.pack(side=tk.RIGHT, padx=10)
+
+        save_button = ttk.Button(bot_frame, text="Save")
+        save_button['command'] = save_checkpoint
+        save_button.pack(side=tk.RIGHT, padx=10)
+
         self.pattern_selection_box = ttk.Combobox(bot_frame, state='readonly')
         self.pattern_selection_box.bind(
             '<<ComboboxSelected>>', self.pattern_selected)
@@ -243,32 +908,117 @@ class LifeApp(tk.Tk):
         self.place_pattern_button['command'] = self.toggle_pattern_placing
         self.place_pattern_button.pack(side=tk.RIGHT, padx=15)
 
+        cache_file = self._settings['pattern_directories']['cache']
+        self.pattern_cache = patterncache.PatternCache(
+            os.path.join(sys.path[0], cache_file) if cache_file else None)
+
         dirs = self._settings['pattern_directories']['startup'].split(',')
+        startup_files = []
         for dir_ in dirs:
             for file in os.listdir(os.path.join(sys.path[0], dir_)):
                 if file.endswith('.rle'):
-                    self.add_pattern_file(
+                    startup_files.append(
                         os.path.join(sys.path[0], dir_, file))
-        del dirs
+        self.add_pattern_files(startup_files)
+        del dirs, startup_files
+
+        self.active_tiles = tk.StringVar()
+        if hasattr(self.cells.engine, 'active_tiles'):
+            ttk.Label(bot_frame, textvariable=self.active_tiles).pack(
+                side=tk.LEFT, padx=15)
+
+        self.history_info = tk.StringVar()
+        if self.cells.history is not None:
+            ttk.Label(bot_frame, textvariable=self.history_info).pack(
+                side=tk.LEFT, padx=15)
+
+        self.cycle_info = tk.StringVar()
+        ttk.Label(bot_frame, textvariable=self.cycle_info).pack(
+            side=tk.LEFT, padx=15)
+        self._shown_cycle = None
+
+        # a detected cycle can be followed to any later generation at once
+        self.jump_str = tk.StringVar()
+        jump_entry = ttk.Entry(bot_frame, textvariable=self.jump_str, width=10)
+        jump_entry.bind('<Return>', lambda event: self.fast_forward())
+        jump_entry.pack(side=tk.LEFT)
+        self.jump_button = ttk.Button(bot_frame, text="Jump",
+                                      state='disabled')
+        self.jump_button['command'] = self.fast_forward
+        self.jump_button.pack(side=tk.LEFT, padx=10)
 
         def new_gen():
             self.cells.new_gen(self.rules)
-
-        self.cell_updater = Updater(
-            100, new_gen, self,
-            lambda b=run_button: b.config(text='Stop'),
-            lambda b=run_button: b.config(text='Start'))
+            if hasattr(self.cells.engine, 'active_tiles'):
+                self.active_tiles.set(
+                    'Active tiles: {}'.format(self.cells.engine.active_tiles))
+            self.show_history()
+            self.show_cycle()
+
+        self.simulation = None
+        if threaded:
+            # the canvas only sees some generations, the worker looks for
+            # cycles in all of them
+            detector = None
+            if self.cells.cycles is not None:
+                detector = cycles.CycleDetector(
+                    int(self._settings['cycles']['table_size']))
+            self.simulation = simworker.SimulationWorker(
+                self._simulation_grid(), self.rules,
+                queue_size=int(self._settings['simulation']['queue_size']),
+                cycles=detector)
+
+            self.rates = tk.StringVar()
+            ttk.Label(bot_frame, textvariable=self.rates).pack(
+                side=tk.LEFT, padx=15)
+
+            def show_latest_generation():
+                self.simulation.rules = self.rules
+                frame = self.simulation.latest_frame()
+                if frame is not None:
+                    self.cells.show_generation(*frame)
+                    self.show_history()
+                    self.show_cycle()
+
+                self.rates.set('Sim: {:.1f} gen/s Render: {:.1f} fps'.format(
+                    self.simulation.sim_rate.rate,
+                    self.cell_updater.render_rate.rate))
+                return frame is not None
+
+            self.cell_updater = SimulationUpdater(
+                100, int(self._settings['simulation']['render_interval']),
+                self.simulation, show_latest_generation, self,
+                lambda b=run_button: b.config(text='Stop'),
+                lambda b=run_button: b.config(text='Start'),
+                self.cells.instruments)
+        else:
+            self.cell_updater = Updater(
+                100, new_gen, self,
+                lambda b=run_button: b.config(text='Stop'),
+                lambda b=run_button: b.config(text='Start'),
+                self.cells.instruments)
 
         run_button['command'] = self.cell_updater.toggle_run
         update_rate_slider.set(self.cell_updater.rate)
 
         self.selection_updater = Updater(20, self.draw_selection, self)
+        self._drawn_selection = None
         self.selection_updater.x = 0
         self.selection_updater.y = 0
 
-        self.cells.draw_grid()
+        self.stats = None
+        self.bind('i', lambda event: self.toggle_stats())
+        if self._settings['stats'].getboolean('overlay'):
+            self.toggle_stats()
 
         self.mainloop()
+        self.close()
+
+    def close(self):
+        """ Stop the simulation and release what the engines hold """
+        if self.simulation is not None:
+            self.simulation.close()
+        self.cells.close()
 
     @property
     def rules(self):
@@ -301,22 +1051,169 @@ class LifeApp(tk.Tk):
             for rule in new_rulesets[i]:
                 rulesets[i][rule].set(True)
 
+        if hasattr(self, 'cells'):
+            self.check_rules()
+
+    def check_rules(self):
+        """ Turn off birth on 0 neighbours if the grid cannot run it """
+        try:
+            self.cells.check_rules(self.rules)
+        except ValueError as e:
+            self._birth_rules[0].set(False)
+            showerror('Rules', str(e), parent=self)
+
+    def show_history(self):
+        history = self.cells.history
+        if history is None or history.newest is None:
+            self.history_info.set('')
+            return
+        self.history_info.set('History: {}-{} {:.1f} MB'.format(
+            history.oldest, history.newest, history.memory / 2 ** 20))
+
+    def show_cycle(self):
+        """ Show a newly detected cycle, pausing if the settings ask to """
+        detector = self.cells.cycles
+        if self.simulation is not None:
+            detector = self.simulation.cycles
+        cycle = None if detector is None else detector.cycle
+        if cycle == self._shown_cycle:
+            return
+        self._shown_cycle = cycle
+        self.cycle_info.set('' if cycle is None else str(cycle))
+        self.jump_button['state'] = 'disabled' if cycle is None else 'normal'
+
+        if (cycle is not None and
+                self._settings['cycles'].getboolean('pause')):
+            self.cell_updater.stop_run()
+
+    def toggle_stats(self):
+        """ Show or hide per phase timings over the cells """
+        hooks = self.cells.instruments
+        if self.stats is None:
+            self.stats = instruments.RollingStats(
+                int(self._settings['stats']['window']))
+            hooks.add_hook(self.stats)
+            hooks.add_hook(self.show_stats)
+        else:
+            hooks.remove_hook(self.stats)
+            hooks.remove_hook(self.show_stats)
+            self.stats = None
+            self.cells.delete('stats')
+
+    def show_stats(self, record):
+        """ Redraw the stats overlay once per update """
+        if record['source'] != 'update':
+            return
+        self.cells.delete('stats')
+        self.cells.create_text(
+            4, 4, anchor=tk.NW, text=self.stats.report(),
+            fill=self._settings['selection']['color'], font='TkFixedFont',
+            tag='stats')
+
+    def rewind(self):
+        self.cell_updater.stop_run()
+        self._drawn_selection = None
+        if self.cells.rewind():
+            self._sync_simulation()
+        self.show_history()
+        self.show_cycle()
+
+    def fast_forward(self):
+        """ Jump to the entered generation along the detected cycle """
+        self.cell_updater.stop_run()
+        self._drawn_selection = None
+        cycle = None
+        if self.simulation is not None:
+            cycle = self.simulation.detected_cycle(self.rules)
+        try:
+            self.cells.fast_forward(int(self.jump_str.get()), self.rules,
+                                    cycle=cycle)
+        except ValueError as e:
+            print(e)
+            return
+        self._sync_simulation()
+        self.show_history()
+        self.show_cycle()
+
+    def save_checkpoint(self, filename):
+        try:
+            self.cells.save_checkpoint(filename, self.rules)
+        except (IOError, ImportError, ValueError) as e:
+            print(e)
+
+    def export_rle(self, filename):
+        """ Write the live cells as an RLE pattern """
+        try:
+            import rleexport
+            rleexport.write_rle(self.cells, filename, self.rules,
+                                comment='generation {}'.format(
+                                    self.cells.iteration))
+        except (IOError, ImportError) as e:
+            print(e)
+
+    def load_checkpoint(self, filename):
+        self.cell_updater.stop_run()
+        self._drawn_selection = None
+        try:
+            saved = self.cells.load_checkpoint(filename)
+        except (IOError, ImportError, ValueError) as e:
+            print(e)
+            return
+        self.rules = saved.rules
+        self._sync_simulation()
+        self.show_history()
+        self.show_cycle()
+
+    def _sync_simulation(self):
+        """ Continue a stopped simulation from the generation on the canvas """
+        if self.simulation is None:
+            return
+        grid = self.simulation.grid
+        grid.setgrid(self.cells.copy_grid())
+        if grid.engine is not None:
+            grid.engine.reset()
+        self.simulation.reset(grid)
+        self.simulation.iteration = self.cells.iteration
+
+    def _simulation_grid(self):
+        """ A new CellGrid the size of the canvas for the simulation """
+        return life.CellGrid(
+            1, lambda _: self.cells.width, lambda _: self.cells.height,
+            self._settings['grid']['engine'],
+            self._settings['grid']['topology'],
+            {'workers': int(self._settings['grid']['workers'])})
+
     def add_pattern_files(self, files):
         for file in files:
-            self.add_pattern_file(file)
+            self._load_pattern_file(file)
+        self._patterns_added()
 
     def add_pattern_file(self, file):
+        self._load_pattern_file(file)
+        self._patterns_added()
+
+    def _load_pattern_file(self, file):
+        """
+        Add a pattern file's name, size and rules, its runs are only read
+        once it is placed
+        """
         try:
-            new_pattern = life.Pattern.parsefile(file)
-        except IOError as e:
+            new_pattern = self.pattern_cache.load(file)
+        except (IOError, life.PatternParseError) as e:
             print(e)
         else:
-            self.patterns[new_pattern[0]] = new_pattern[1]
-            self.pattern_selection_box['values'] = sorted(self.patterns.keys())
+            self.patterns[new_pattern.name] = new_pattern
+
+    def _patterns_added(self):
+        self.pattern_selection_box['values'] = sorted(self.patterns.keys())
+        try:
+            self.pattern_cache.save()
+        except IOError as e:
+            print(e)
 
     def mouse_loc_from_event(self, event):
-        self.selection_updater.x = self.cells.grid(event.x - 1)
-        self.selection_updater.y = self.cells.grid(event.y - 1)
+        self.selection_updater.x = self.cells.grid_x(event.x - 1)
+        self.selection_updater.y = self.cells.grid_y(event.y - 1)
 
     def mouse_entered_canvas(self, event):
         self.mouse_loc_from_event(event)
@@ -326,78 +1223,64 @@ class LifeApp(tk.Tk):
         self.disable_pattern_placing()
         self.selection_updater.stop_run()
         self.cells.delete('selection')
+        self._drawn_selection = None
 
     def mouse_moved_in_canvas(self, event):
         self.mouse_loc_from_event(event)
 
     def draw_selection(self):
-        self.cells.delete('selection')
-
         x = self.selection_updater.x
         y = self.selection_updater.y
 
-        def get_selectioncolor(x, y):
-            if not self.cells[x][y]:
-                return self._settings['selection']['color']
-            else:
-                return self._settings['selection']['color_over_cell']
-
+        # the selection only changes with the mouse cell, the pattern and
+        # its orientation, or the cells under it
         if self.patternselection is None:
-            self.cells.draw_cell(x, y, get_selectioncolor(x, y), 'selection')
+            drawn = (x, y, self.cells.iteration)
         else:
-            xstart = x - self.patternselection.center_x
-            ystart = y - self.patternselection.center_y
-
-            def draw_pattern_selection(state, x, y):
-                if state != 'b' and state != 'B':
-                    x = self.cells.wrap_x(xstart + x)
-                    y = self.cells.wrap_y(ystart + y)
-
-                    self.cells.draw_cell(
-                        x, y, get_selectioncolor(x, y), 'selection')
-
-            # replace with func
-
-            self.patternselection.interpret(draw_pattern_selection)
-
-    def canvas_press(self, event):
-        x = self.cells.grid(event.x)
-        y = self.cells.grid(event.y)
-
-        def invert(x, y):
-            self.cells[x][y] ^= True
-
-            if self.cells[x][y]:
-                self.cells.draw_cell(x, y)
-            else:
-                self.cells.undraw_cell(x, y)
-
+            drawn = (x, y, self.cells.iteration, self.patternselection,
+                     self.patternselection.orientation)
+        if drawn == self._drawn_selection:
+            return
+        self._drawn_selection = drawn
+
+        colors = (self._settings['selection']['color'],
+                  self._settings['selection']['color_over_cell'])
+        cells = self.selected_cells(x, y)
+        self.cells.show_selection(
+            cells, [colors[self.cells[x][y]] for x, y in cells])
+
+    def selected_cells(self, x, y):
+        """ (x, y) of the cells the selection covers with the mouse at x, y """
         if self.patternselection is None:
-            invert(x, y)
-
-        else:
-            xstart = x - self.patternselection.center_x
-            ystart = y - self.patternselection.center_y
+            return [(x, y)]
 
-            def place_pattern(state, x, y):
-                if state != 'b' and state != 'B':
-                    x = self.cells.wrap_x(xstart + x)
-                    y = self.cells.wrap_y(ystart + y)
-                    invert(x, y)
+        xstart = x - self.patternselection.center_x
+        ystart = y - self.patternselection.center_y
+        wrap_x = self.cells.wrap_x
+        wrap_y = self.cells.wrap_y
+        return [(wrap_x(xstart + dx), wrap_y(ystart + dy))
+                for dx, dy in self.patternselection.stamp()]
 
-            # replace with func
+    def canvas_press(self, event):
+        x = self.cells.grid_x(event.x)
+        y = self.cells.grid_y(event.y)
+        self._drawn_selection = None
 
-            if self.patternselection.rules != self.rules:
-                self.rules = self.patternselection.rules
-                self.reset()
+        if (self.patternselection is not None and
+                self.patternselection.rules != self.rules):
+            self.rules = self.patternselection.rules
+            self.reset()
 
-            self.patternselection.interpret(place_pattern)
+        changed = self.cells.invert_cells(self.selected_cells(x, y))
+        if self.simulation is not None:
+            for x, y in changed:
+                self.simulation.set_cell(x, y, self.cells[x][y])
 
     def enable_pattern_placing(self):
         try:
             self.patternselection = life.Selection(
-                self.patterns[self.selected_pattern_name])
-        except KeyError:
+                self.patterns[self.selected_pattern_name].pattern())
+        except (KeyError, IOError, life.PatternParseError):
             pass
         else:
             self.place_pattern_button['text'] = "X"
@@ -427,48 +1310,90 @@ class LifeApp(tk.Tk):
 
     @property
     def cell_size(self):
-        return int(self.entry_str.get())
+        """ Cell size entered, fractions like 1/4 zoom out below a pixel """
+        return float(Fraction(self.entry_str.get()))
 
     @cell_size.setter
     def cell_size(self, new_cell_size):
         self.entry_str.set(new_cell_size)
 
+    def show_cell_size(self):
+        if self.cells.shrink > 1:
+            self.cell_size = '1/{}'.format(self.cells.shrink)
+        else:
+            self.cell_size = self.cells.cellsize
+
+    def view_changed(self):
+        self._drawn_selection = None
+        self.cells.delete('selection')
+        self.show_cell_size()
+
+    def apply_cell_size(self):
+        """ Zoom to the entered cell size, the cells are left as they are """
+        try:
+            self.cells.zoom = self.cell_size
+        except (ValueError, ZeroDivisionError) as e:
+            print(e)
+        self.view_changed()
+
+    def zoom_by(self, factor, x_canvas=None, y_canvas=None):
+        """ Zoom keeping the cell under canvas (x, y), or the middle """
+        if x_canvas is None:
+            x_canvas = self.cells.canvaswidth // 2
+            y_canvas = self.cells.canvasheight // 2
+
+        # cell sizes below size_limit are raised back to it, zooming out
+        # goes on to the first size below a pixel instead
+        zoom = self.cells.zoom * factor
+        limit = int(self._settings['cell']['size_limit'])
+        while factor < 1 and 1 <= zoom < limit:
+            zoom *= factor
+        self.cells.zoom_at(zoom, x_canvas, y_canvas)
+        self.view_changed()
+
+    def pan(self, dx, dy):
+        self.cells.pan(dx, dy)
+        self.view_changed()
+
+    def drag_started(self, event):
+        self._drag = (event.x, event.y)
+
+    def dragged(self, event):
+        """ Pan by whole cells as the view is dragged """
+        cells_x = self.cells.grid_x(self._drag[0]) - self.cells.grid_x(event.x)
+        cells_y = self.cells.grid_y(self._drag[1]) - self.cells.grid_y(event.y)
+        if cells_x or cells_y:
+            self.pan(cells_x, cells_y)
+            self._drag = (event.x, event.y)
+
     def reset(self):
         self.cell_updater.stop_run()
+        self._drawn_selection = None
 
         try:
-            new_cell_size = self.cell_size
-        except AttributeError:
+            self.cells.reset(self.cell_size)
+        except (ValueError, ZeroDivisionError) as e:
+            print(e)
             self.cells.reset()
-        else:
-            if self.cells.cellsize != new_cell_size:
-                limit = int(self._settings['cell']['size_limit'])
-                if new_cell_size < limit:
-                    new_cell_size = limit
+        self.view_changed()
 
-                self.cells.cellsize = new_cell_size
-
-                # if cell size becomes too big, hide canvas
-                if (self.cells.canvaswidth == 0 or
-                        self.cells.canvasheight == 0):
-                    self.cells.config(width=0, height=0)
-                else:
-                    self.cells.config(
-                        width=self.cells.canvaswidth,
-                        height=self.cells.canvasheight)
-            else:
-                self.cells.reset()
+        if self.simulation is not None:
+            self.simulation.reset(self._simulation_grid())
+        self.show_history()
+        self.show_cycle()
 
 
 class Updater(object):
     def __init__(self, rate, func, root,
-                 start_run_func=None, stop_run_func=None):
+                 start_run_func=None, stop_run_func=None, instruments=None):
         self.rate = rate
         self.func = func
         self.start_run_func = start_run_func
         self.stop_run_func = stop_run_func
         self.root = root
+        self.instruments = instruments
         self.update_process = None
+        self._due = None
 
     def set_update_rate(self, new_update_rate):
         wasrunning = False
@@ -511,9 +1436,77 @@ class Updater(object):
         return False
 
     def _schedule_next_update(self):
-        self.update_process = self.root.after(
-            self.rate, self._update)
+        self._schedule(self.rate)
+
+    def _schedule(self, delay):
+        self._due = time.perf_counter() + delay / 1000
+        self.update_process = self.root.after(delay, self._update)
+
+    def _start_timer(self):
+        """ A PhaseTimer with how late this update ran as its 'late' """
+        if self.instruments is None or not self.instruments.enabled:
+            return instruments.NULL_TIMER
+        timer = self.instruments.timer()
+        timer.phases['late'] = max(0.0, time.perf_counter() - self._due)
+        return timer
+
+    def _emit(self, timer):
+        """ Time Tk drawing what func changed and pass the record on """
+        timer.lap('func')
+        if timer:
+            self.root.update_idletasks()
+            timer.lap('tk_draw')
+            self.instruments.emit('update', timer, rate=self.rate)
 
     def _update(self):
+        timer = self._start_timer()
         self.func()
-        self._schedule_next_update()
+        self._emit(timer)
+
+        # func may have stopped the run
+        if self.isrunning:
+            self._schedule_next_update()
+
+
+class SimulationUpdater(Updater):
+    """
+    Updater whose generations run on a SimulationWorker. func is called
+    every render_interval ms to show the latest finished generation and
+    returns True if it had one to show. rate is the minimum time per
+    generation in ms, 0 for as fast as possible.
+    """
+
+    def __init__(self, rate, render_interval, simulation, func, root,
+                 start_run_func=None, stop_run_func=None, instruments=None):
+        super().__init__(rate, func, root, start_run_func, stop_run_func,
+                         instruments)
+        self.render_interval = render_interval
+        self.render_rate = simworker.RateMeter()
+        self.simulation = simulation
+        self.simulation.rate = rate
+
+    def set_update_rate(self, new_update_rate):
+        self.rate = new_update_rate
+        self.simulation.rate = new_update_rate
+
+    def start_run(self):
+        super().start_run()
+        self.simulation.start()
+
+    def stop_run(self):
+        super().stop_run()
+        if self.simulation.isrunning:
+            self.simulation.stop()
+            self.func()
+
+    def _schedule_next_update(self):
+        self._schedule(self.render_interval)
+
+    def _update(self):
+        timer = self._start_timer()
+        if self.func():
+            self.render_rate.tick()
+        self._emit(timer)
+
+        if self.isrunning:
+            self._schedule_next_update()